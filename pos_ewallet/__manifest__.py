@@ -1,11 +1,11 @@
 {
     'name': 'POS eWallet',
-    'version': '19.0.1.0.0',
+    'version': '19.0.1.1.0',
     'summary': 'Sistema de monedero electrónico (eWallet) para POS con portal independiente',
     'description': """
         Módulo integral de monedero electrónico (eWallet) para Punto de Venta:
         - Programa único de tipo eWallet con gestión centralizada.
-        - Producto de recarga con variantes de monto (10–1000).
+        - Producto de recarga único con monto ingresado por el cajero (mínimo, máximo y múltiplo configurables).
         - Producto eWallet (tarjeta) con variantes Propietario/Visitante.
         - Descuentos diferenciados por tipo de monedero.
         - Monederos con código de 16 dígitos, PIN seguro, activación controlada.
@@ -25,16 +25,26 @@
     'data': [
         'security/ir.model.access.csv',
         'security/ewallet_security.xml',
+        'data/ewallet_provisioning_data.xml',
+        'data/ewallet_barcode_data.xml',
         'views/loyalty_program_views.xml',
         'views/loyalty_card_views.xml',
         'views/product_template_views.xml',
         'views/res_partner_views.xml',
         'views/portal_templates.xml',
+        'views/res_config_settings_views.xml',
+        'views/pos_payment_method_views.xml',
+        'views/pos_order_views.xml',
+        'wizard/ewallet_card_issue_wizard_views.xml',
     ],
     'assets': {
         'point_of_sale._assets_pos': [
             'pos_ewallet/static/src/app/**/*',
         ],
+        'web.assets_unit_tests': [
+            'pos_ewallet/static/src/app/services/ewallet_index.js',
+            'pos_ewallet/static/tests/unit/**/*',
+        ],
     },
     'post_init_hook': '_pos_ewallet_post_init_hook',
     'installable': True,
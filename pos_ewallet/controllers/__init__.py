@@ -1,2 +1,3 @@
 # -*- coding: utf-8 -*-
-from . import portal
\ No newline at end of file
+from . import portal
+from . import statement
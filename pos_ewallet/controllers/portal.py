@@ -1,7 +1,11 @@
 import base64
+from datetime import datetime
 
 from odoo import _, http
 from odoo.http import request
+from odoo.tools import format_datetime
+
+from .statement import stream_statement_csv
 
 
 class EwalletPortalController(http.Controller):
@@ -9,6 +13,7 @@ class EwalletPortalController(http.Controller):
 
     SESSION_COOKIE = 'ewallet_session_token'
     TIMEOUT_MINUTES = 5
+    HISTORY_PAGE_SIZE = 50
 
     # ── Utilidades internas ──
 
@@ -21,6 +26,15 @@ class EwalletPortalController(http.Controller):
             token, self.TIMEOUT_MINUTES
         )
 
+    def _verify_credential(self, throttle_key, verify):
+        """Ejecuta verify() con límite de concurrencia y control de intentos fallidos.
+
+        Turnos y contadores se guardan en la base de datos, compartidos por todos los workers.
+        Retorna (válido, error); ver ewallet.auth.attempt._verify_throttled().
+        """
+        ip_key = f'ip:{request.httprequest.remote_addr}'
+        return request.env['ewallet.auth.attempt'].sudo()._verify_throttled(throttle_key, ip_key, verify)
+
     def _render(self, template, values, status=200):
         """Renderiza un template QWeb como HTML standalone (sin portal/website)."""
         values.setdefault('company', request.env.company)
@@ -56,9 +70,7 @@ class EwalletPortalController(http.Controller):
                 'username': '',
             })
 
-        partner = request.env['res.partner'].sudo().search([
-            ('ewallet_username', '=', username),
-        ], limit=1)
+        partner = request.env['res.partner'].sudo()._find_ewallet_partner(username)
 
         if not partner:
             return self._render('pos_ewallet.ewallet_login_step1', {
@@ -95,9 +107,7 @@ class EwalletPortalController(http.Controller):
                 'username': username,
             })
 
-        partner = request.env['res.partner'].sudo().search([
-            ('ewallet_username', '=', username),
-        ], limit=1)
+        partner = request.env['res.partner'].sudo()._find_ewallet_partner(username)
 
         if not partner:
             return self._render('pos_ewallet.ewallet_login_step1', {
@@ -136,11 +146,14 @@ class EwalletPortalController(http.Controller):
                     'partner_name': partner.name,
                     'error': None,
                 })
-            if not partner.verify_ewallet_password(password):
+            valid, error = self._verify_credential(
+                f'user:{partner.id}', lambda: partner.verify_ewallet_password(password)
+            )
+            if not valid:
                 return self._render('pos_ewallet.ewallet_login_step2_password', {
                     'username': username,
                     'partner_name': partner.name,
-                    'error': _("Contraseña incorrecta."),
+                    'error': error or _("Contraseña incorrecta."),
                 })
 
         # ── Crear sesión ──
@@ -201,18 +214,84 @@ class EwalletPortalController(http.Controller):
         if not card:
             return request.redirect('/ewallet/dashboard')
 
-        history_lines = request.env['loyalty.history'].sudo().search([
-            ('card_id', '=', card.id),
-        ], order='create_date desc', limit=50)
+        history_lines, has_more = card._ewallet_history_page(limit=self.HISTORY_PAGE_SIZE)
 
         return self._render('pos_ewallet.ewallet_card_detail', {
             'partner': partner,
             'card': card,
             'history_lines': history_lines,
+            'history_cursor': self._history_cursor(history_lines, has_more),
             'error': kw.get('error'),
             'success': kw.get('success'),
         })
 
+    # ── Historial paginado (JSON para scroll infinito) ──
+
+    def _history_cursor(self, history_lines, has_more):
+        """Cursor (create_date, id) del último movimiento de la página, o None si no hay más.
+
+        La fecha se envía en ISO con microsegundos: truncarla a segundos saltaría los
+        movimientos del mismo segundo (p. ej. todos los de una misma transacción).
+        """
+        if not has_more or not history_lines:
+            return None
+        last = history_lines[-1]
+        return {'date': last.create_date.isoformat(), 'id': last.id}
+
+    @http.route('/ewallet/card/<int:card_id>/history', type='http', auth='public',
+                website=False, methods=['GET'], csrf=False, sitemap=False)
+    def ewallet_card_history(self, card_id, before_date=None, before_id=None, **kw):
+        partner = self._get_authenticated_partner()
+        if not partner:
+            return request.make_json_response({'error': 'unauthorized'}, status=401)
+
+        card = request.env['loyalty.card'].sudo().search([
+            ('id', '=', card_id),
+            ('partner_id', '=', partner.id),
+            ('program_id.is_ewallet_program', '=', True),
+        ], limit=1)
+        if not card:
+            return request.make_json_response({'error': 'not_found'}, status=404)
+
+        try:
+            before_date = datetime.fromisoformat(before_date) if before_date else None
+            before_id = int(before_id) if before_id else None
+        except ValueError:
+            return request.make_json_response({'error': 'bad_cursor'}, status=400)
+
+        history_lines, has_more = card._ewallet_history_page(
+            before_date, before_id, limit=self.HISTORY_PAGE_SIZE,
+        )
+        return request.make_json_response({
+            'lines': [{
+                'id': line.id,
+                'date': format_datetime(request.env, line.create_date, dt_format='short'),
+                'description': line.description or '',
+                'issued': line.issued,
+                'used': line.used,
+            } for line in history_lines],
+            'next_cursor': self._history_cursor(history_lines, has_more),
+        })
+
+    # ── Estado de cuenta CSV ──
+
+    @http.route('/ewallet/card/<int:card_id>/statement.csv', type='http', auth='public',
+                website=False, methods=['GET'], csrf=False, sitemap=False)
+    def ewallet_card_statement(self, card_id, **kw):
+        partner = self._get_authenticated_partner()
+        if not partner:
+            return request.redirect('/ewallet')
+
+        card = request.env['loyalty.card'].sudo().search([
+            ('id', '=', card_id),
+            ('partner_id', '=', partner.id),
+            ('program_id.is_ewallet_program', '=', True),
+        ], limit=1)
+        if not card:
+            return request.redirect('/ewallet/dashboard')
+
+        return stream_statement_csv(card.id, f'estado_cuenta_{card.code}.csv')
+
     # ── Activar monedero ──
 
     @http.route('/ewallet/card/<int:card_id>/activate', type='http',
@@ -295,8 +374,13 @@ class EwalletPortalController(http.Controller):
         new_pin = post.get('new_pin', '').strip()
         new_pin_confirm = post.get('new_pin_confirm', '').strip()
 
-        if not card.verify_wallet_pin(current_pin):
-            return request.redirect(f'/ewallet/card/{card_id}?error=PIN actual incorrecto.')
+        valid, error = self._verify_credential(
+            f'card:{card.id}', lambda: card.verify_wallet_pin(current_pin)
+        )
+        if not valid:
+            return request.redirect(
+                f'/ewallet/card/{card_id}?error={error or "PIN actual incorrecto."}'
+            )
 
         if new_pin != new_pin_confirm:
             return request.redirect(f'/ewallet/card/{card_id}?error=Los PINs no coinciden.')
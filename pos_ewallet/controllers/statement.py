@@ -0,0 +1,37 @@
+from odoo import api, http
+from odoo.http import request
+from odoo.modules.registry import Registry
+
+
+def stream_statement_csv(card_id, filename):
+    """Respuesta HTTP que transmite el estado de cuenta CSV del monedero.
+
+    El generador abre su propio cursor: la respuesta se consume después de que
+    el cursor de la petición ya se cerró.
+    """
+    dbname, uid, context = request.db, request.env.uid, dict(request.env.context)
+
+    def generate():
+        with Registry(dbname).cursor() as cr:
+            env = api.Environment(cr, uid, context)
+            card = env['loyalty.card'].sudo().browse(card_id)
+            yield from card._ewallet_statement_csv_chunks()
+
+    response = request.make_response(generate(), headers=[
+        ('Content-Type', 'text/csv; charset=utf-8'),
+        ('Content-Disposition', f'attachment; filename="{filename}"'),
+    ])
+    response.direct_passthrough = True
+    return response
+
+
+class EwalletStatementController(http.Controller):
+    """Descarga del estado de cuenta eWallet desde el backend."""
+
+    @http.route('/pos_ewallet/card/<int:card_id>/statement.csv', type='http', auth='user')
+    def ewallet_backend_statement(self, card_id, **kw):
+        card = request.env['loyalty.card'].browse(card_id)
+        card.check_access('read')
+        if not card.sudo().program_id.is_ewallet_program:
+            return request.not_found()
+        return stream_statement_csv(card.id, f'estado_cuenta_{card.sudo().code}.csv')
@@ -0,0 +1,7 @@
+from odoo import api, SUPERUSER_ID
+
+
+def migrate(cr, version):
+    """Reemplaza las variantes de monto de la recarga por un único producto con monto libre."""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['ewallet.provisioning']._provision()
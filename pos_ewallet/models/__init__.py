@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
+from . import ewallet_credential
+from . import ewallet_provisioning
 from . import loyalty_program
 from . import loyalty_card
+from . import loyalty_history
 from . import product_template
 from . import res_partner
 from . import ewallet_session
-from . import pos_order
\ No newline at end of file
+from . import ewallet_auth_attempt
+from . import pos_order
+from . import pos_payment
+from . import pos_payment_method
+from . import pos_config
+from . import res_config_settings
\ No newline at end of file
@@ -0,0 +1,136 @@
+import time
+from datetime import timedelta
+
+from odoo import _, api, fields, models
+from odoo.tools import SQL
+
+# Espacio de nombres de los advisory locks que limitan las verificaciones simultáneas
+VERIFY_LOCK_NAMESPACE = 0x45574C54
+# Verificaciones de PIN/contraseña simultáneas permitidas en toda la base de datos
+VERIFY_CONCURRENCY = 4
+# Espera máxima (segundos) por un turno de verificación antes de rechazar
+VERIFY_WAIT_SECONDS = 2.0
+# Intervalo (segundos) entre intentos de tomar un turno libre
+VERIFY_POLL_SECONDS = 0.05
+# Ventana (segundos) durante la que se cuentan los intentos fallidos
+THROTTLE_WINDOW_SECONDS = 300
+# Intentos fallidos permitidos dentro de la ventana, por cuenta y por IP
+MAX_CREDENTIAL_FAILURES = 5
+MAX_IP_FAILURES = 20
+
+
+class EwalletAuthAttempt(models.Model):
+    _name = 'ewallet.auth.attempt'
+    _description = 'Intento fallido de autenticación eWallet'
+    _log_access = False
+
+    throttle_key = fields.Char(
+        string="Clave",
+        required=True,
+        help="Cuenta (user:<id>, card:<id>) o dirección IP (ip:<addr>) del intento fallido.",
+    )
+    attempted_at = fields.Datetime(
+        string="Fecha",
+        required=True,
+        default=fields.Datetime.now,
+    )
+
+    _throttle_key_attempted_at_idx = models.Index('(throttle_key, attempted_at)')
+
+    # ── Intentos fallidos compartidos entre workers ──
+
+    @api.model
+    def _is_blocked(self, throttle_key, max_failures, window_seconds=THROTTLE_WINDOW_SECONDS):
+        """Indica si la clave alcanzó max_failures intentos fallidos dentro de la ventana."""
+        since = fields.Datetime.now() - timedelta(seconds=window_seconds)
+        self.env.cr.execute(SQL(
+            """
+            SELECT count(*) >= %s
+              FROM (SELECT 1
+                      FROM ewallet_auth_attempt
+                     WHERE throttle_key = %s AND attempted_at > %s
+                     LIMIT %s) AS recent
+            """,
+            max_failures, throttle_key, since, max_failures,
+        ))
+        return self.env.cr.fetchone()[0]
+
+    @api.model
+    def _add_failure(self, *throttle_keys):
+        self.sudo().create([{'throttle_key': key} for key in throttle_keys])
+
+    @api.model
+    def _reset(self, throttle_key):
+        self.env.cr.execute(SQL(
+            "DELETE FROM ewallet_auth_attempt WHERE throttle_key = %s", throttle_key,
+        ))
+
+    @api.autovacuum
+    def _gc_expired_attempts(self):
+        since = fields.Datetime.now() - timedelta(seconds=THROTTLE_WINDOW_SECONDS)
+        self.env.cr.execute(SQL(
+            "DELETE FROM ewallet_auth_attempt WHERE attempted_at <= %s", since,
+        ))
+
+    # ── Turnos de verificación compartidos entre workers ──
+
+    @api.model
+    def _get_verify_concurrency(self):
+        value = self.env['ir.config_parameter'].sudo().get_param('pos_ewallet.verify_concurrency')
+        try:
+            return max(1, int(value)) if value else VERIFY_CONCURRENCY
+        except ValueError:
+            return VERIFY_CONCURRENCY
+
+    @api.model
+    def _acquire_verify_slot(self, concurrency=None, wait_seconds=VERIFY_WAIT_SECONDS):
+        """Toma uno de los `concurrency` turnos de verificación (advisory locks de sesión).
+
+        Los turnos son comunes a todos los workers y procesos de la base de datos, de modo
+        que una ráfaga de inicios de sesión no acapara todos los workers calculando hashes.
+        Retorna el número de turno, o None si no se liberó ninguno dentro de wait_seconds.
+        El turno debe liberarse con _release_verify_slot() sobre el mismo cursor.
+        """
+        concurrency = concurrency or self._get_verify_concurrency()
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            for slot in range(concurrency):
+                self.env.cr.execute(SQL(
+                    "SELECT pg_try_advisory_lock(%s, %s)", VERIFY_LOCK_NAMESPACE, slot,
+                ))
+                if self.env.cr.fetchone()[0]:
+                    return slot
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(VERIFY_POLL_SECONDS)
+
+    @api.model
+    def _release_verify_slot(self, slot):
+        self.env.cr.execute(SQL(
+            "SELECT pg_advisory_unlock(%s, %s)", VERIFY_LOCK_NAMESPACE, slot,
+        ))
+
+    # ── Verificación con límite de concurrencia e intentos ──
+
+    @api.model
+    def _verify_throttled(self, throttle_key, ip_key, verify):
+        """Ejecuta verify() con límite de concurrencia y control de intentos fallidos.
+
+        Retorna (válido, error); error es el mensaje a mostrar cuando la
+        verificación fue rechazada sin llegar a calcular el hash.
+        """
+        if (self._is_blocked(throttle_key, MAX_CREDENTIAL_FAILURES)
+                or self._is_blocked(ip_key, MAX_IP_FAILURES)):
+            return False, _("Demasiados intentos fallidos. Intenta de nuevo en unos minutos.")
+        slot = self._acquire_verify_slot()
+        if slot is None:
+            return False, _("El servicio está ocupado. Intenta de nuevo en unos segundos.")
+        try:
+            valid = verify()
+        finally:
+            self._release_verify_slot(slot)
+        if valid:
+            self._reset(throttle_key)
+        else:
+            self._add_failure(throttle_key, ip_key)
+        return valid, None
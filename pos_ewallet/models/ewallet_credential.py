@@ -0,0 +1,151 @@
+import hashlib
+import inspect
+import logging
+import os
+import time
+
+from werkzeug.security import (
+    DEFAULT_PBKDF2_ITERATIONS,
+    check_password_hash,
+    generate_password_hash,
+)
+
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+
+def _werkzeug_supports_scrypt():
+    """Werkzeug < 2.3 no conoce scrypt: trata el método como nombre de digest HMAC y falla."""
+    try:
+        generate_password_hash('', method='scrypt:2:1:1')
+    except ValueError:
+        return False
+    return True
+
+
+SCRYPT_SUPPORTED = _werkzeug_supports_scrypt()
+
+
+def _normalize_hash_method(method):
+    """Completa el método con los parámetros por defecto de werkzeug para compararlo
+    con el prefijo almacenado en el hash (p. ej. 'pbkdf2' → 'pbkdf2:sha256:600000').
+
+    Lanza ValueError si el método no es scrypt[:n:r:p] ni pbkdf2[:hash[:iteraciones]].
+    """
+    name, *args = (method or '').strip().split(':')
+    if name == 'scrypt':
+        if not SCRYPT_SUPPORTED:
+            raise ValueError(f"La versión instalada de werkzeug no soporta scrypt: {method!r}")
+        args = args or ['32768', '8', '1']
+        if len(args) != 3 or not all(arg.isdigit() and int(arg) > 0 for arg in args):
+            raise ValueError(f"Parámetros scrypt inválidos: {method!r}")
+        n = int(args[0])
+        if n < 2 or n & (n - 1):
+            raise ValueError(f"El costo n de scrypt debe ser potencia de 2: {method!r}")
+    elif name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else str(DEFAULT_PBKDF2_ITERATIONS)
+        if (len(args) > 2 or hash_name not in hashlib.algorithms_available
+                or not iterations.isdigit() or not int(iterations)):
+            raise ValueError(f"Parámetros pbkdf2 inválidos: {method!r}")
+        args = [hash_name, iterations]
+    else:
+        raise ValueError(f"Método de hash no soportado: {method!r}")
+    return ':'.join([name, *args])
+
+
+# Método por defecto de la versión instalada de werkzeug (scrypt desde 3.0, pbkdf2 antes),
+# completado con sus parámetros por defecto
+DEFAULT_HASH_METHOD = _normalize_hash_method(
+    inspect.signature(generate_password_hash).parameters['method'].default
+)
+
+
+def _peak_rss_kb(func):
+    """Ejecuta func en un proceso hijo y retorna el pico de memoria residente que agregó, en KB.
+
+    El KDF reserva su memoria en OpenSSL, fuera del alcance de tracemalloc, por eso
+    se mide el RSS máximo del hijo (wait4) contra un hijo que no hace nada.
+    Retorna None si la plataforma no permite fork.
+    """
+    if not hasattr(os, 'wait4'):
+        return None
+
+    def child_maxrss(target):
+        pid = os.fork()
+        if not pid:
+            try:
+                target()
+            finally:
+                os._exit(0)
+        return os.wait4(pid, 0)[2].ru_maxrss
+
+    baseline = child_maxrss(lambda: None)
+    return max(child_maxrss(func) - baseline, 0)
+
+
+class EwalletCredential(models.AbstractModel):
+    _name = 'ewallet.credential'
+    _description = 'Hash de credenciales eWallet (PIN y contraseña)'
+
+    @api.model
+    def _get_hash_method(self):
+        """Método de hash configurado en el parámetro 'pos_ewallet.hash_method'."""
+        method = self.env['ir.config_parameter'].sudo().get_param(
+            'pos_ewallet.hash_method', DEFAULT_HASH_METHOD
+        )
+        try:
+            return _normalize_hash_method(method)
+        except ValueError as e:
+            # Un valor mal escrito no debe impedir los inicios de sesión
+            _logger.warning("pos_ewallet.hash_method inválido (%s); se usa %s", e, DEFAULT_HASH_METHOD)
+            return DEFAULT_HASH_METHOD
+
+    @api.model
+    def _hash_secret(self, secret):
+        """Genera el hash del PIN o contraseña con el método configurado."""
+        return generate_password_hash(secret, method=self._get_hash_method())
+
+    @api.model
+    def _check_secret(self, secret_hash, secret):
+        """Verifica el secreto contra su hash.
+
+        Retorna (válido, nuevo_hash). nuevo_hash es distinto de False cuando el hash
+        almacenado usa otro método o costo que el configurado y debe reemplazarse.
+        """
+        if not secret_hash or not check_password_hash(secret_hash, secret or ''):
+            return False, False
+        method = self._get_hash_method()
+        if secret_hash.split('$', 1)[0] != method:
+            return True, generate_password_hash(secret, method=method)
+        return True, False
+
+    # ── Micro-benchmark para elegir el método según el presupuesto del worker ──
+
+    @api.model
+    def _benchmark_hash_methods(self, methods=None, rounds=5):
+        """Mide la latencia media de verificación y el pico de memoria de una verificación por método.
+
+        memory_kb es el RSS máximo que agrega una verificación en un proceso hijo
+        (None si la plataforma no permite fork).
+        """
+        if not methods:
+            methods = [DEFAULT_HASH_METHOD, 'pbkdf2:sha256:600000', 'pbkdf2:sha256:100000']
+            if SCRYPT_SUPPORTED:
+                methods += ['scrypt:32768:8:1', 'scrypt:16384:8:1']
+            methods = list(dict.fromkeys(methods))
+        report = []
+        for method in methods:
+            method = _normalize_hash_method(method)
+            secret_hash = generate_password_hash('1234', method=method)
+            start = time.perf_counter()
+            for _round in range(rounds):
+                check_password_hash(secret_hash, '1234')
+            elapsed = (time.perf_counter() - start) / rounds
+            report.append({
+                'method': method,
+                'verify_ms': round(elapsed * 1000, 2),
+                'memory_kb': _peak_rss_kb(lambda: check_password_hash(secret_hash, '1234')),
+            })
+        return report
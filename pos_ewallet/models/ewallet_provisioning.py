@@ -0,0 +1,189 @@
+from odoo import api, models
+from odoo.fields import Command
+
+TOPUP_PRODUCT_NAME = 'Recargar eWallet'
+EWALLET_PRODUCT_NAME = 'eWallet'
+TYPE_ATTRIBUTE = 'TIPO'
+ATTRIBUTE_VALUES = {
+    TYPE_ATTRIBUTE: ['Propietario', 'Visitante'],
+}
+# Atributo de las antiguas variantes de monto de la recarga, retirado del producto
+LEGACY_AMOUNT_ATTRIBUTE = 'Monto'
+
+
+class EwalletProvisioning(models.AbstractModel):
+    _name = 'ewallet.provisioning'
+    _description = 'Aprovisionamiento eWallet'
+
+    @api.model
+    def _provision(self, company=None):
+        """Crea de forma idempotente atributos, productos, programa, regla y recompensa eWallet.
+
+        Cada modelo se consulta una sola vez y lo que falta se crea en lote. Con `company`,
+        el programa (único en la base de datos) se crea para esa empresa si aún no existe.
+        """
+        self = self.sudo()
+        if company:
+            self = self.with_company(company)
+        attributes, values = self._provision_attributes()
+        topup_tmpl, ewallet_tmpl = self._provision_products()
+        self._provision_attribute_lines({
+            ewallet_tmpl: (attributes[TYPE_ATTRIBUTE], values[TYPE_ATTRIBUTE]),
+        })
+        self._remove_topup_amount_variants(topup_tmpl)
+        program = self._provision_program(company)
+        self._provision_rule_and_reward(program, topup_tmpl)
+        return program
+
+    # ── Atributos y valores ──
+
+    def _provision_attributes(self):
+        Attribute = self.env['product.attribute']
+        attributes = {
+            attribute.name: attribute
+            for attribute in Attribute.search([('name', 'in', list(ATTRIBUTE_VALUES))])
+        }
+        missing = [name for name in ATTRIBUTE_VALUES if name not in attributes]
+        if missing:
+            for attribute in Attribute.create([{
+                'name': name,
+                'display_type': 'radio',
+                'create_variant': 'always',
+            } for name in missing]):
+                attributes[attribute.name] = attribute
+
+        existing_values = self.env['product.attribute.value'].search([
+            ('attribute_id', 'in', [attribute.id for attribute in attributes.values()]),
+        ])
+        existing_keys = {(value.attribute_id.name, value.name) for value in existing_values}
+        existing_values |= self.env['product.attribute.value'].create([
+            {'attribute_id': attributes[attr_name].id, 'name': value_name}
+            for attr_name, value_names in ATTRIBUTE_VALUES.items()
+            for value_name in value_names
+            if (attr_name, value_name) not in existing_keys
+        ])
+        values = {
+            attr_name: existing_values.filtered(
+                lambda value, attr_name=attr_name: value.attribute_id.name == attr_name
+                and value.name in ATTRIBUTE_VALUES[attr_name]
+            )
+            for attr_name in ATTRIBUTE_VALUES
+        }
+        return attributes, values
+
+    # ── Productos ──
+
+    def _provision_products(self):
+        Template = self.env['product.template']
+        templates = Template.search([
+            '|', ('is_ewallet_product', '=', True),
+            ('name', 'in', [TOPUP_PRODUCT_NAME, EWALLET_PRODUCT_NAME]),
+        ])
+        topup_tmpl = templates.filtered(lambda tmpl: tmpl.name == TOPUP_PRODUCT_NAME)[:1]
+        ewallet_tmpl = (
+            templates.filtered('is_ewallet_product')
+            or templates.filtered(lambda tmpl: tmpl.name == EWALLET_PRODUCT_NAME)
+        )[:1]
+
+        common = {
+            'type': 'service',
+            'list_price': 0.0,
+            'sale_ok': True,
+            'purchase_ok': False,
+            'available_in_pos': True,
+        }
+        to_create = []
+        if not topup_tmpl:
+            to_create.append({**common, 'name': TOPUP_PRODUCT_NAME})
+        if not ewallet_tmpl:
+            to_create.append({**common, 'name': EWALLET_PRODUCT_NAME, 'is_ewallet_product': True})
+        for tmpl in Template.create(to_create):
+            if tmpl.is_ewallet_product:
+                ewallet_tmpl = tmpl
+            else:
+                topup_tmpl = tmpl
+
+        if not ewallet_tmpl.is_ewallet_product:
+            ewallet_tmpl.is_ewallet_product = True
+        return topup_tmpl, ewallet_tmpl
+
+    def _provision_attribute_lines(self, lines_by_template):
+        """Vincula a cada plantilla su atributo con todos sus valores (genera las variantes)."""
+        templates = self.env['product.template'].union(*lines_by_template)
+        existing = self.env['product.template.attribute.line'].search([
+            ('product_tmpl_id', 'in', templates.ids),
+        ])
+        existing_keys = {(line.product_tmpl_id.id, line.attribute_id.id) for line in existing}
+        self.env['product.template.attribute.line'].create([
+            {
+                'product_tmpl_id': tmpl.id,
+                'attribute_id': attribute.id,
+                'value_ids': [Command.set(values.ids)],
+            }
+            for tmpl, (attribute, values) in lines_by_template.items()
+            if (tmpl.id, attribute.id) not in existing_keys
+        ])
+        templates.invalidate_recordset(['product_variant_ids'])
+
+    def _remove_topup_amount_variants(self, topup_tmpl):
+        """Retira el atributo de monto de la recarga: el cajero ingresa el monto y basta un único producto."""
+        legacy_lines = topup_tmpl.attribute_line_ids.filtered(
+            lambda line: line.attribute_id.name == LEGACY_AMOUNT_ATTRIBUTE
+        )
+        if legacy_lines:
+            legacy_lines.unlink()
+            topup_tmpl.invalidate_recordset(['product_variant_ids'])
+
+    # ── Programa, regla y recompensa ──
+
+    def _provision_program(self, company=None):
+        Program = self.env['loyalty.program']
+        program = Program.search([('program_type', '=', 'ewallet')], limit=1)
+        if not program:
+            vals = {
+                'name': 'eWallet',
+                'program_type': 'ewallet',
+                'is_ewallet_program': True,
+                'applies_on': 'future',
+                'trigger': 'auto',
+                'portal_visible': True,
+                'portal_point_name': '$',
+                'pos_ok': True,
+            }
+            if company:
+                vals['company_id'] = company.id
+            return Program.create(vals)
+
+        vals = {}
+        if not program.is_ewallet_program:
+            vals['is_ewallet_program'] = True
+        if program.name != 'eWallet':
+            vals['name'] = 'eWallet'
+        if vals:
+            program.write(vals)
+        return program
+
+    def _provision_rule_and_reward(self, program, topup_tmpl):
+        variant_ids = set(topup_tmpl.product_variant_ids.ids)
+        rule = program.rule_ids[:1]
+        if not rule:
+            self.env['loyalty.rule'].create({
+                'program_id': program.id,
+                'reward_point_amount': '1',
+                'reward_point_mode': 'money',
+                'reward_point_split': False,
+                'product_ids': [Command.set(list(variant_ids))],
+            })
+        elif set(rule.product_ids.ids) != variant_ids:
+            rule.write({'product_ids': [Command.set(list(variant_ids))]})
+
+        if not program.reward_ids:
+            self.env['loyalty.reward'].create({
+                'program_id': program.id,
+                'reward_type': 'discount',
+                'discount_mode': 'per_point',
+                'discount': 1,
+                'discount_applicability': 'order',
+                'required_points': 1,
+                'description': 'eWallet',
+            })
@@ -3,6 +3,12 @@ from datetime import timedelta
 
 from odoo import _, api, fields, models
 
+# Fracción del timeout que debe transcurrir antes de persistir la renovación
+SESSION_RENEW_RATIO = 0.2
+# Sesiones eliminadas por lote en la purga del cron
+SESSION_PURGE_BATCH_SIZE = 1000
+
+
 class EwalletSession(models.Model):
     _name = 'ewallet.session'
     _description = 'Sesión Portal eWallet'
@@ -18,7 +24,6 @@ class EwalletSession(models.Model):
     token = fields.Char(
         string="Token de Sesión",
         required=True,
-        index=True,
     )
     expires_at = fields.Datetime(
         string="Expira",
@@ -29,15 +34,22 @@ class EwalletSession(models.Model):
         default=True,
     )
 
-    # ── Crear sesión invalidando las anteriores ──
+    _token_unique = models.Constraint(
+        'UNIQUE(token)',
+        "El token de sesión debe ser único.",
+    )
+    # Índices de la purga: vencidas por expires_at e inactivas por write_date
+    _expires_at_idx = models.Index('(expires_at)')
+    _inactive_write_date_idx = models.Index('(write_date) WHERE NOT is_active')
+
+    # ── Crear sesión eliminando las anteriores ──
 
     @api.model
     def create_session(self, partner_id, timeout_minutes=5):
-        """Crea sesión nueva e invalida todas las anteriores del mismo cliente."""
+        """Crea sesión nueva y elimina todas las anteriores del mismo cliente."""
         self.sudo().search([
             ('partner_id', '=', partner_id),
-            ('is_active', '=', True),
-        ]).write({'is_active': False})
+        ]).unlink()
 
         token = uuid.uuid4().hex
         expires_at = fields.Datetime.now() + timedelta(minutes=timeout_minutes)
@@ -51,7 +63,12 @@ class EwalletSession(models.Model):
 
     @api.model
     def validate_session(self, token, timeout_minutes=5):
-        """Valida token de sesión. Renueva timeout si es válido. Retorna partner o False."""
+        """Valida token de sesión sin escribir en cada petición. Retorna partner o False.
+
+        La expiración deslizante solo se persiste cuando ya transcurrió al menos
+        SESSION_RENEW_RATIO del timeout desde la última renovación. Las sesiones
+        vencidas no se tocan aquí: las purga el cron de limpieza.
+        """
         if not token:
             return False
 
@@ -63,13 +80,14 @@ class EwalletSession(models.Model):
         if not session:
             return False
 
-        if session.expires_at < fields.Datetime.now():
-            session.write({'is_active': False})
+        now = fields.Datetime.now()
+        if session.expires_at < now:
             return False
 
-        session.write({
-            'expires_at': fields.Datetime.now() + timedelta(minutes=timeout_minutes),
-        })
+        timeout = timedelta(minutes=timeout_minutes)
+        elapsed = timeout - (session.expires_at - now)
+        if elapsed >= timeout * SESSION_RENEW_RATIO:
+            session.write({'expires_at': now + timeout})
         return session.partner_id
 
     # ── Invalidar sesión ──
@@ -86,13 +104,31 @@ class EwalletSession(models.Model):
         if session:
             session.write({'is_active': False})
 
-    # ── Limpieza de sesiones expiradas (llamado por cron) ──
+    # ── Purga de sesiones expiradas (llamado por cron) ──
 
     @api.model
-    def cleanup_expired_sessions(self):
-        """Desactiva todas las sesiones cuyo timeout haya vencido."""
-        expired = self.sudo().search([
-            ('is_active', '=', True),
-            ('expires_at', '<', fields.Datetime.now()),
-        ])
-        expired.write({'is_active': False})
\ No newline at end of file
+    def cleanup_expired_sessions(self, batch_size=SESSION_PURGE_BATCH_SIZE, auto_commit=False):
+        """Elimina por lotes las sesiones vencidas o inactivas fuera del periodo de retención.
+
+        La retención (en días) se lee del parámetro 'pos_ewallet.session_retention_days'
+        (por defecto 0). Con auto_commit, usado por el cron, se confirma cada lote
+        para no mantener una transacción larga sobre la tabla.
+        """
+        retention_days = int(self.env['ir.config_parameter'].sudo().get_param(
+            'pos_ewallet.session_retention_days', 0
+        ))
+        cutoff = fields.Datetime.now() - timedelta(days=retention_days)
+        domain = [
+            '|',
+            ('expires_at', '<', cutoff),
+            '&', ('is_active', '=', False), ('write_date', '<', cutoff),
+        ]
+        while True:
+            sessions = self.sudo().search(domain, order='id', limit=batch_size)
+            if not sessions:
+                break
+            sessions.unlink()
+            if auto_commit:
+                self.env.cr.commit()
+            if len(sessions) < batch_size:
+                break
@@ -1,8 +1,16 @@
-import random
+import csv
+import io
+import secrets
 
-from odoo import _, api, fields, models
+from odoo import SUPERUSER_ID, _, api, fields, models
 from odoo.exceptions import ValidationError
-from werkzeug.security import generate_password_hash, check_password_hash
+from odoo.fields import Domain
+from odoo.tools import SQL
+
+# Movimientos leídos por lote al generar el estado de cuenta
+STATEMENT_BATCH_SIZE = 2000
+# Monederos creados por llamada a create() en la emisión masiva
+ISSUE_BATCH_SIZE = 1000
 
 class LoyaltyCard(models.Model):
     _inherit = 'loyalty.card'
@@ -40,81 +48,151 @@ class LoyaltyCard(models.Model):
         for card in self:
             card.wallet_pin_set = bool(card.wallet_pin_hash)
 
-    # ── Generación de código numérico de 16 dígitos ──
+    # ── Generación de códigos numéricos de 16 dígitos ──
 
     @api.model
     def _generate_ewallet_code(self):
         """Genera un código numérico único de 16 dígitos."""
+        return self._generate_ewallet_codes(1)[0]
+
+    @api.model
+    def _generate_ewallet_codes(self, count):
+        """Genera `count` códigos únicos de 16 dígitos con `secrets`.
+
+        Cada ronda descarta las colisiones con códigos existentes en una sola
+        consulta y solo regenera los que faltan.
+        """
+        codes = set()
         for _attempt in range(100):
-            code = ''.join([str(random.randint(0, 9)) for _ in range(16)])
-            if not self.sudo().search_count([('code', '=', code)]):
-                return code
+            candidates = {f'{secrets.randbelow(10 ** 16):016d}' for _ in range(count - len(codes))} - codes
+            self.env.cr.execute(SQL(
+                "SELECT code FROM loyalty_card WHERE code = ANY(%s)", list(candidates),
+            ))
+            codes |= candidates - {row[0] for row in self.env.cr.fetchall()}
+            if len(codes) >= count:
+                return list(codes)
         raise ValidationError(
             _("No se pudo generar un código de monedero único tras 100 intentos.")
         )
 
+    # ── Emisión masiva de monederos ──
+
+    @api.model
+    def _ewallet_issue_cards(self, count, wallet_type, batch_size=ISSUE_BATCH_SIZE):
+        """Crea `count` monederos sin cliente del programa eWallet, por lotes de create()."""
+        program = self.env['loyalty.program'].sudo().search([
+            ('is_ewallet_program', '=', True),
+        ], limit=1)
+        if not program:
+            raise ValidationError(_("No existe el programa eWallet."))
+
+        codes = self._generate_ewallet_codes(count)
+        card_ids = []
+        for start in range(0, count, batch_size):
+            cards = self.sudo().create([{
+                'program_id': program.id,
+                'code': code,
+                'wallet_type': wallet_type,
+                'points': 0,
+            } for code in codes[start:start + batch_size]])
+            card_ids.extend(cards.ids)
+        return self.browse(card_ids)
+
     # ── Gestión de PIN ──
 
     def set_wallet_pin(self, pin):
-        """Establece el PIN del monedero con hash seguro (bcrypt)."""
+        """Establece el PIN del monedero con el hash configurado (ver ewallet.credential)."""
         self.ensure_one()
         if not pin or not pin.isdigit() or len(pin) < 4:
             raise ValidationError(
                 _("El PIN debe ser numérico y tener al menos 4 dígitos.")
             )
         self.sudo().write({
-            'wallet_pin_hash': generate_password_hash(pin),
+            'wallet_pin_hash': self.env['ewallet.credential']._hash_secret(pin),
         })
 
     def verify_wallet_pin(self, pin):
-        """Verifica el PIN contra el hash almacenado."""
+        """Verifica el PIN contra el hash almacenado; si el método configurado cambió, lo rehashea."""
         self.ensure_one()
         if not self.wallet_pin_hash:
             return False
-        return check_password_hash(self.wallet_pin_hash, pin or '')
+        valid, new_hash = self.env['ewallet.credential']._check_secret(self.wallet_pin_hash, pin)
+        if new_hash:
+            self.sudo().write({'wallet_pin_hash': new_hash})
+        return valid
 
     # ── Restricción: un solo monedero por tipo por cliente ──
+    # Ambas restricciones se validan con una única agregación por lote sobre los
+    # clientes afectados, sin importar cuántos monederos se creen o modifiquen.
+
+    def _get_ewallet_partner_ids_to_check(self, condition):
+        """Ids de los clientes de monederos eWallet del lote que cumplen `condition`, en una consulta.
+
+        Se consulta en SQL en lugar de leer los campos por ORM para que el número de
+        consultas no dependa del tamaño del lote (la lectura se prefetchea por bloques).
+        """
+        self.flush_recordset(['partner_id', 'program_id', 'wallet_type', 'wallet_active'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT DISTINCT card.partner_id
+              FROM loyalty_card card
+              JOIN loyalty_program program ON program.id = card.program_id
+             WHERE card.id = ANY(%s)
+               AND card.partner_id IS NOT NULL
+               AND program.is_ewallet_program
+               AND %s
+            """,
+            self.ids, condition,
+        ))
+        return [row[0] for row in self.env.cr.fetchall()]
 
     @api.constrains('wallet_type', 'partner_id', 'program_id')
     def _check_wallet_type_uniqueness(self):
-        for card in self:
-            if not card.wallet_type or not card.partner_id:
-                continue
-            if not card.program_id.is_ewallet_program:
-                continue
-            existing = self.sudo().search_count([
-                ('partner_id', '=', card.partner_id.id),
-                ('wallet_type', '=', card.wallet_type),
+        partner_ids = self._get_ewallet_partner_ids_to_check(SQL("card.wallet_type IS NOT NULL"))
+        if not partner_ids:
+            return
+        duplicates = self.sudo()._read_group(
+            [
+                ('partner_id', 'in', partner_ids),
+                ('wallet_type', '!=', False),
                 ('program_id.is_ewallet_program', '=', True),
-                ('id', '!=', card.id),
-            ])
-            if existing:
-                type_label = dict(
-                    self._fields['wallet_type'].selection
-                ).get(card.wallet_type, card.wallet_type)
-                raise ValidationError(
-                    _("El cliente ya tiene un monedero de tipo %s.", type_label)
-                )
+            ],
+            groupby=['partner_id', 'wallet_type'],
+            aggregates=['__count'],
+            having=[('__count', '>', 1)],
+            limit=1,
+        )
+        if duplicates:
+            wallet_type = duplicates[0][1]
+            type_label = dict(
+                self._fields['wallet_type'].selection
+            ).get(wallet_type, wallet_type)
+            raise ValidationError(
+                _("El cliente ya tiene un monedero de tipo %s.", type_label)
+            )
 
     # ── Restricción: solo un monedero activo por cliente ──
 
     @api.constrains('wallet_active', 'partner_id', 'program_id')
     def _check_single_active_wallet(self):
-        for card in self:
-            if not card.wallet_active or not card.partner_id:
-                continue
-            if not card.program_id.is_ewallet_program:
-                continue
-            active_count = self.sudo().search_count([
-                ('partner_id', '=', card.partner_id.id),
+        partner_ids = self._get_ewallet_partner_ids_to_check(SQL("card.wallet_active"))
+        if not partner_ids:
+            return
+        duplicates = self.sudo()._read_group(
+            [
+                ('partner_id', 'in', partner_ids),
                 ('wallet_active', '=', True),
                 ('program_id.is_ewallet_program', '=', True),
-                ('id', '!=', card.id),
-            ])
-            if active_count:
-                raise ValidationError(
-                    _("El cliente solo puede tener un monedero activo a la vez.")
-                )
+            ],
+            groupby=['partner_id'],
+            aggregates=['__count'],
+            having=[('__count', '>', 1)],
+            limit=1,
+        )
+        if duplicates:
+            raise ValidationError(
+                _("El cliente solo puede tener un monedero activo a la vez.")
+            )
 
     # ── Activación del monedero ──
 
@@ -162,6 +240,137 @@ class LoyaltyCard(models.Model):
         self.ensure_one()
         self.sudo().write({'wallet_active': False})
 
+    # ── Deducción atómica de saldo ──
+
+    def _ewallet_deduct_points(self, amount):
+        """Descuenta saldo con una única sentencia condicional sobre la fila del monedero.
+
+        La verificación de saldo y el descuento ocurren en el mismo UPDATE, por lo que
+        el saldo nunca queda negativo. El bloqueo de la fila se mantiene hasta el fin de
+        la transacción: bajo REPEATABLE READ, un cobro concurrente sobre el mismo monedero
+        espera y termina en un error de serialización que Odoo resuelve reintentando la
+        petición completa.
+        Retorna el saldo restante, o None si el saldo es insuficiente.
+        """
+        self.ensure_one()
+        self.flush_recordset(['points'])
+        self.env.cr.execute(SQL(
+            """
+            UPDATE loyalty_card
+               SET points = points - %s,
+                   write_uid = %s,
+                   write_date = (now() AT TIME ZONE 'UTC')
+             WHERE id = %s AND points >= %s
+         RETURNING points
+            """,
+            amount, self.env.uid, self.id, amount,
+        ))
+        row = self.env.cr.fetchone()
+        self.invalidate_recordset(['points', 'write_uid', 'write_date'])
+        if not row:
+            return None
+        self.modified(['points'])
+        self._ewallet_notify_pos()
+        return row[0]
+
+    # ── Historial paginado por keyset (create_date, id) ──
+
+    def _ewallet_history_page(self, before_date=None, before_id=None, limit=50):
+        """Retorna (movimientos, hay_más) anteriores al cursor, del más reciente al más antiguo.
+
+        El cursor (create_date, id) se compara como fila para recorrer el índice
+        (card_id, create_date DESC, id DESC) sin OFFSET, de modo que el costo no
+        depende de cuán profundo se pagine.
+        """
+        self.ensure_one()
+        cursor_condition = SQL()
+        if before_date and before_id:
+            cursor_condition = SQL(
+                "AND (create_date, id) < (%s, %s)", before_date, int(before_id),
+            )
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM loyalty_history
+             WHERE card_id = %s %s
+          ORDER BY create_date DESC, id DESC
+             LIMIT %s
+            """,
+            self.id, cursor_condition, limit + 1,
+        ))
+        ids = [row[0] for row in self.env.cr.fetchall()]
+        return self.env['loyalty.history'].browse(ids[:limit]), len(ids) > limit
+
+    # ── Estado de cuenta CSV en streaming ──
+
+    def _ewallet_statement_csv_chunks(self, batch_size=STATEMENT_BATCH_SIZE):
+        """Genera el estado de cuenta en CSV por fragmentos, con saldo acumulado.
+
+        Los movimientos se leen en orden cronológico por lotes con cursor
+        (create_date, id) y sin pasar por la caché del ORM, así que la memoria
+        es constante sin importar el tamaño del historial. El saldo inicial se
+        deduce del saldo actual menos el neto del historial.
+        """
+        self.ensure_one()
+        cr = self.env.cr
+        cr.execute(SQL(
+            "SELECT COALESCE(SUM(issued - used), 0) FROM loyalty_history WHERE card_id = %s",
+            self.id,
+        ))
+        balance = self.points - cr.fetchone()[0]
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def flush():
+            data = buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            return data.encode('utf-8')
+
+        writer.writerow([_("Fecha (UTC)"), _("Concepto"), _("Carga"), _("Consumo"), _("Saldo")])
+        writer.writerow(['', _("Saldo inicial"), '', '', f'{balance:.2f}'])
+        yield flush()
+
+        last_date, last_id = None, 0
+        while True:
+            cursor_condition = SQL()
+            if last_date:
+                cursor_condition = SQL("AND (create_date, id) > (%s, %s)", last_date, last_id)
+            cr.execute(SQL(
+                """
+                SELECT id, create_date, description, issued, used
+                  FROM loyalty_history
+                 WHERE card_id = %s %s
+              ORDER BY create_date, id
+                 LIMIT %s
+                """,
+                self.id, cursor_condition, batch_size,
+            ))
+            rows = cr.fetchall()
+            for _id, create_date, description, issued, used in rows:
+                balance += (issued or 0.0) - (used or 0.0)
+                writer.writerow([
+                    create_date, description or '',
+                    f'{issued:.2f}' if issued else '',
+                    f'{used:.2f}' if used else '',
+                    f'{balance:.2f}',
+                ])
+            if rows:
+                yield flush()
+            if len(rows) < batch_size:
+                break
+            last_id, last_date = rows[-1][0], rows[-1][1]
+
+    def action_ewallet_statement(self):
+        """Descarga el estado de cuenta CSV del monedero desde el backend."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/pos_ewallet/card/{self.id}/statement.csv',
+            'target': 'self',
+        }
+
     # ── Transferencia de saldo (upgrade Visitante → Propietario) ──
 
     def transfer_balance_from(self, source_card):
@@ -192,7 +401,58 @@ class LoyaltyCard(models.Model):
         source_card.sudo().write({'points': 0})
         self.sudo().write({'points': self.points + transfer_amount})
 
-    # ── Campos exportados al POS ──
+    # ── Cambios de saldo y activación notificados a los POS abiertos ──
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'points' in vals or 'wallet_active' in vals:
+            self._ewallet_notify_pos()
+        return res
+
+    def _ewallet_notify_pos(self):
+        """Programa la publicación del saldo y estado de los monederos a los POS abiertos tras el commit.
+
+        El saldo se relee en una transacción nueva después del commit: un cobro revertido
+        por un savepoint (o una transacción abortada) nunca llega a los terminales.
+        """
+        cards = self.filtered(lambda card: card.program_id.is_ewallet_program)
+        if not cards:
+            return
+        postcommit = self.env.cr.postcommit
+        card_ids = postcommit.data.get('pos_ewallet.notify_card_ids')
+        if card_ids is None:
+            card_ids = postcommit.data['pos_ewallet.notify_card_ids'] = set()
+            registry = self.env.registry
+
+            @postcommit.add
+            def publish():
+                with registry.cursor() as cr:
+                    env = api.Environment(cr, SUPERUSER_ID, {})
+                    env['loyalty.card'].browse(card_ids).exists()._ewallet_send_pos_updates()
+        card_ids.update(cards.ids)
+
+    def _ewallet_send_pos_updates(self):
+        """Envía al bus de cada configuración con sesión abierta el saldo confirmado de los monederos."""
+        configs = self.env['pos.session'].sudo().search([('state', '!=', 'closed')]).config_id
+        if not self or not configs:
+            return
+        payload = [{
+            'id': card.id,
+            'points': card.points,
+            'wallet_active': card.wallet_active,
+        } for card in self]
+        for config in configs:
+            config._notify(('EWALLET_CARD_UPDATE', payload))
+
+    # ── Datos exportados al POS ──
+
+    @api.model
+    def _load_pos_data_domain(self, data, config):
+        domain = super()._load_pos_data_domain(data, config)
+        # Con carga diferida, los monederos eWallet se consultan bajo demanda
+        if config.ewallet_lazy_cards:
+            domain = Domain.AND([domain, [('program_id.is_ewallet_program', '=', False)]])
+        return domain
 
     @api.model
     def _load_pos_data_fields(self, config):
@@ -0,0 +1,18 @@
+from odoo import fields, models
+
+class LoyaltyHistory(models.Model):
+    _inherit = 'loyalty.history'
+
+    ewallet_idempotency_key = fields.Char(
+        string="Clave de idempotencia eWallet",
+        copy=False,
+        readonly=True,
+        help="Clave generada por el POS para cada cobro eWallet; evita cobrar dos veces "
+             "el mismo pago cuando se reintenta o se sincroniza desde la cola offline.",
+    )
+
+    _ewallet_idempotency_key_unique = models.UniqueIndex(
+        '(ewallet_idempotency_key) WHERE ewallet_idempotency_key IS NOT NULL',
+        "Este cobro eWallet ya fue registrado.",
+    )
+    _card_create_date_idx = models.Index('(card_id, create_date DESC, id DESC)')
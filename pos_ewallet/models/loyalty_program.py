@@ -29,6 +29,21 @@ class LoyaltyProgram(models.Model):
         help="Si está activo, se solicitará el PIN del monedero antes de confirmar "
              "el pago con eWallet en el Punto de Venta.",
     )
+    topup_min_amount = fields.Float(
+        string="Recarga Mínima",
+        default=10.0,
+        help="Monto mínimo que el cajero puede ingresar en una recarga eWallet.",
+    )
+    topup_max_amount = fields.Float(
+        string="Recarga Máxima",
+        default=1000.0,
+        help="Monto máximo que el cajero puede ingresar en una recarga eWallet.",
+    )
+    topup_step = fields.Float(
+        string="Múltiplo de Recarga",
+        default=10.0,
+        help="El monto de la recarga debe ser múltiplo de este valor. Use 0 para permitir cualquier monto.",
+    )
 
     # ── Restricción: solo un programa ewallet ──
 
@@ -45,6 +60,35 @@ class LoyaltyProgram(models.Model):
                         _("Solo puede existir un programa de tipo eWallet en la base de datos.")
                     )
 
+    @api.constrains('topup_min_amount', 'topup_max_amount', 'topup_step')
+    def _check_topup_amounts(self):
+        for program in self.filtered('is_ewallet_program'):
+            if program.topup_min_amount <= 0 or program.topup_step < 0:
+                raise ValidationError(
+                    _("La recarga mínima debe ser mayor que cero y el múltiplo no puede ser negativo.")
+                )
+            if program.topup_max_amount < program.topup_min_amount:
+                raise ValidationError(
+                    _("La recarga máxima no puede ser menor que la recarga mínima.")
+                )
+
+    # ── Límites de recarga (también los aplica el POS al pedir el monto) ──
+
+    def _ewallet_get_topup_error(self, amount):
+        """Retorna el mensaje de error si el monto de recarga no respeta los límites del programa, o None."""
+        self.ensure_one()
+        if amount <= 0:
+            return _("Ingrese un monto de recarga válido.")
+        if self.topup_min_amount and amount < self.topup_min_amount:
+            return _("La recarga mínima es %s.", self.topup_min_amount)
+        if self.topup_max_amount and amount > self.topup_max_amount:
+            return _("La recarga máxima es %s.", self.topup_max_amount)
+        if self.topup_step:
+            ratio = amount / self.topup_step
+            if abs(ratio - round(ratio)) > 1e-6:
+                return _("El monto de la recarga debe ser múltiplo de %s.", self.topup_step)
+        return None
+
     # ── Auto-marcar como programa eWallet al crear ──
 
     @api.model_create_multi
@@ -68,5 +112,8 @@ class LoyaltyProgram(models.Model):
             'owner_discount',
             'visitor_discount',
             'require_pin',
+            'topup_min_amount',
+            'topup_max_amount',
+            'topup_step',
         ])
         return fields
\ No newline at end of file
@@ -0,0 +1,11 @@
+from odoo import fields, models
+
+class PosConfig(models.Model):
+    _inherit = 'pos.config'
+
+    ewallet_lazy_cards = fields.Boolean(
+        string="Carga diferida de monederos eWallet",
+        default=False,
+        help="No precarga los monederos eWallet al abrir el POS: se consultan al servidor "
+             "por cliente o por código escaneado cuando se necesitan.",
+    )
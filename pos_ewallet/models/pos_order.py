@@ -1,26 +1,65 @@
-from odoo import _, api, models
+import logging
+
+from psycopg2 import IntegrityError
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools import float_compare
+
+_logger = logging.getLogger(__name__)
 
 class PosOrder(models.Model):
     _inherit = 'pos.order'
 
-    # ── Validar PIN del monedero (llamado desde POS vía RPC) ──
+    ewallet_concept = fields.Char(
+        string="Concepto eWallet",
+        help="Concepto de consumo registrado en el historial del monedero al pagar con eWallet.",
+    )
+    ewallet_settlement_state = fields.Selection(
+        selection=[
+            ('settled', 'Liquidado'),
+            ('failed', 'Pendiente de liquidar'),
+        ],
+        string="Liquidación eWallet",
+        readonly=True,
+        copy=False,
+        index='btree_not_null',
+        help="Resultado del descuento de los pagos eWallet de la orden. Las órdenes pendientes "
+             "se sincronizaron pero su monedero no pudo debitarse.",
+    )
+    ewallet_settlement_error = fields.Char(
+        string="Error de liquidación eWallet",
+        readonly=True,
+        copy=False,
+    )
+
+    # ── Validaciones comunes del monedero ──
 
     @api.model
-    def ewallet_validate_pin(self, card_id, pin):
-        """Valida el PIN del monedero eWallet. Retorna dict con 'valid' y opcionalmente 'error'."""
-        card = self.env['loyalty.card'].sudo().browse(card_id)
+    def _ewallet_check_card(self, card, pin=None, check_pin=True):
+        """Retorna el mensaje de error si el monedero no puede usarse, o None."""
         if not card.exists():
-            return {'valid': False, 'error': _("Monedero no encontrado.")}
+            return _("Monedero no encontrado.")
         if not card.program_id.is_ewallet_program:
-            return {'valid': False, 'error': _("El monedero no pertenece al programa eWallet.")}
+            return _("El monedero no pertenece al programa eWallet.")
         if not card.wallet_active:
-            return {'valid': False, 'error': _("El monedero no está activo.")}
-        if not card.wallet_pin_hash:
-            return {'valid': False, 'error': _("El monedero no tiene PIN configurado.")}
+            return _("El monedero no está activo.")
+        if check_pin:
+            if not card.wallet_pin_hash:
+                return _("El monedero no tiene PIN configurado.")
+            if not card.verify_wallet_pin(pin):
+                return _("PIN incorrecto.")
+        return None
+
+    # ── Validar PIN del monedero (llamado desde POS vía RPC) ──
 
-        is_valid = card.verify_wallet_pin(pin)
-        if not is_valid:
-            return {'valid': False, 'error': _("PIN incorrecto.")}
+    @api.model
+    def ewallet_validate_pin(self, card_id, pin):
+        """Valida el PIN del monedero eWallet. Retorna dict con 'valid' y opcionalmente 'error'."""
+        card = self.env['loyalty.card'].sudo().browse(card_id)
+        error = self._ewallet_check_card(card, pin)
+        if error:
+            return {'valid': False, 'error': error}
         return {'valid': True}
 
     # ── Procesar pago con eWallet: descuento + deducción + historial ──
@@ -34,52 +73,296 @@ class PosOrder(models.Model):
                 'success': False,
                 'error': _("Monedero no encontrado o inactivo."),
             }
+        return self._ewallet_charge_card(card, amount, concept, discount_percent)
+
+    # ── Validar PIN y cobrar en una sola llamada ──
+
+    @api.model
+    def ewallet_pay(self, card_id, amount, concept, pin=None, idempotency_key=None):
+        """Valida monedero y PIN, calcula el descuento del programa y cobra en una sola transacción.
+
+        Si idempotency_key ya fue registrada, retorna el cobro original sin volver a cobrar.
+        """
+        if idempotency_key:
+            previous = self._ewallet_find_charge(idempotency_key)
+            if previous:
+                return previous
+
+        card = self.env['loyalty.card'].sudo().browse(card_id).exists()
+        if not card:
+            return {'success': False, 'error': _("Monedero no encontrado.")}
+        program = card.program_id
+        error = self._ewallet_check_card(card, pin, check_pin=program.require_pin)
+        if error:
+            return {'success': False, 'error': error}
+
+        if card.wallet_type == 'owner':
+            discount_percent = program.owner_discount
+        else:
+            discount_percent = program.visitor_discount
+        return self._ewallet_charge_card(
+            card, amount, concept, discount_percent, idempotency_key=idempotency_key,
+        )
+
+    # ── Sincronizar cobros encolados offline ──
+
+    @api.model
+    def ewallet_sync_charges(self, charges):
+        """Procesa en lote los cobros encolados por el POS sin conexión.
+
+        Cada cobro es un dict con card_id, amount, concept e idempotency_key.
+        Retorna la lista de resultados, cada uno con su idempotency_key.
+        Si un reintento concurrente ya registró la misma clave, se retorna ese cobro.
+        """
+        results = []
+        for charge in charges:
+            key = charge.get('idempotency_key')
+            try:
+                with self.env.cr.savepoint():
+                    result = self.ewallet_pay(
+                        charge.get('card_id'),
+                        charge.get('amount', 0.0),
+                        charge.get('concept'),
+                        pin=charge.get('pin'),
+                        idempotency_key=key,
+                    )
+            except UserError as e:
+                result = {'success': False, 'error': str(e)}
+            except IntegrityError:
+                # Otra petición registró la misma clave entre la búsqueda y la inserción;
+                # si aún no es visible en esta transacción, el POS lo reintentará luego.
+                result = self._ewallet_find_charge(key) if key else None
+                if result is None:
+                    result = {
+                        'success': False,
+                        'retry': True,
+                        'error': _("El cobro se está procesando en otra petición."),
+                    }
+            result['idempotency_key'] = key
+            results.append(result)
+        return results
+
+    @api.model
+    def _ewallet_find_charge(self, idempotency_key):
+        """Retorna el resultado de un cobro ya registrado con esa clave, o None."""
+        history = self.env['loyalty.history'].sudo().search([
+            ('ewallet_idempotency_key', '=', idempotency_key),
+        ], limit=1)
+        if not history:
+            return None
+        return {
+            'success': True,
+            'duplicate': True,
+            'amount_charged': history.used,
+            'remaining_balance': history.card_id.points,
+        }
 
+    @api.model
+    def _ewallet_charge_card(self, card, amount, concept, discount_percent=0.0,
+                             idempotency_key=None):
+        """Aplica el descuento, deduce el saldo y registra el consumo en el historial."""
         # Aplicar descuento sobre el total
         if discount_percent > 0:
             discounted_amount = amount * (1 - discount_percent)
         else:
             discounted_amount = amount
 
-        if card.points < discounted_amount:
+        # Verificar y deducir saldo en una sola operación atómica
+        remaining_balance = card._ewallet_deduct_points(discounted_amount)
+        if remaining_balance is None:
             return {
                 'success': False,
                 'error': _("Saldo insuficiente. Disponible: %s, Requerido: %s",
                            card.points, discounted_amount),
             }
 
-        # Deducir saldo y registrar en historial
-        card.sudo().write({
-            'points': card.points - discounted_amount,
-        })
-
+        # Registrar en historial
         self.env['loyalty.history'].sudo().create({
             'card_id': card.id,
             'order_model': self._name,
             'order_id': self.id if self.id else 0,
             'description': concept or _("Consumo POS"),
-            'used': discounted_amount,
-            'issued': 0,
+            # Un importe negativo (devolución) reintegra saldo al monedero
+            'used': max(discounted_amount, 0),
+            'issued': max(-discounted_amount, 0),
+            'ewallet_idempotency_key': idempotency_key or False,
         })
 
         return {
             'success': True,
             'amount_charged': discounted_amount,
             'discount_applied': amount - discounted_amount,
-            'remaining_balance': card.points,
+            'remaining_balance': remaining_balance,
         }
 
+    @api.model
+    def _load_pos_data_fields(self, config):
+        fields = super()._load_pos_data_fields(config)
+        # Una lista vacía significa que se cargan todos los campos
+        if fields:
+            fields.extend(['ewallet_concept', 'ewallet_settlement_state', 'ewallet_settlement_error'])
+        return fields
+
+    # ── Límites de recarga en el servidor ──
+
+    def _ewallet_get_topup_lines(self):
+        """Retorna (programa eWallet, líneas de recarga de la orden con cantidad positiva)."""
+        self.ensure_one()
+        program = self.env['loyalty.program'].sudo().search([('is_ewallet_program', '=', True)], limit=1)
+        topup_products = program.rule_ids.product_ids
+        # Las devoluciones (cantidad negativa) no se validan contra los límites
+        lines = self.lines.filtered(lambda l: l.product_id in topup_products and l.qty > 0)
+        return program, lines
+
+    def _ewallet_get_topup_error(self):
+        """Retorna el mensaje de error si alguna recarga eWallet de la orden no respeta los límites, o None."""
+        program, lines = self._ewallet_get_topup_lines()
+        for line in lines:
+            error = program._ewallet_get_topup_error(line.price_unit * line.qty)
+            if error:
+                return _("Recarga de la orden %(order)s: %(error)s", order=self.name, error=error)
+        return None
+
+    def _ewallet_get_topup_points(self):
+        """Puntos que las reglas del programa eWallet otorgan por las recargas de la orden."""
+        program, lines = self._ewallet_get_topup_lines()
+        points = 0.0
+        for line in lines:
+            for rule in program.rule_ids.filtered(lambda r: line.product_id in r.product_ids):
+                if rule.reward_point_mode == 'money':
+                    points += rule.reward_point_amount * line.price_subtotal_incl
+                elif rule.reward_point_mode == 'unit':
+                    points += rule.reward_point_amount * line.qty
+                else:
+                    points += rule.reward_point_amount
+        return points
+
+    def _ewallet_get_coupon_points_error(self, coupon_data):
+        """Retorna el mensaje de error si los puntos que el POS acredita a monederos eWallet
+        no coinciden con las recargas validadas de la orden, o None."""
+        self.ensure_one()
+        Card = self.env['loyalty.card'].sudo()
+        credited = 0.0
+        for coupon_id, values in coupon_data.items():
+            program_id = values.get('program_id')
+            if not program_id and int(coupon_id) > 0:
+                program_id = Card.browse(int(coupon_id)).exists().program_id.id
+            program = self.env['loyalty.program'].sudo().browse(program_id)
+            if program_id and program.is_ewallet_program and values.get('points', 0) > 0:
+                credited += values['points']
+        expected = self._ewallet_get_topup_points()
+        if float_compare(credited, expected, precision_rounding=self.currency_id.rounding) > 0:
+            return _(
+                "La orden %(order)s acredita %(credited)s puntos eWallet, pero sus recargas solo otorgan %(expected)s.",
+                order=self.name, credited=credited, expected=expected,
+            )
+        return None
+
+    def confirm_coupon_programs(self, coupon_data):
+        """Rechaza acreditar saldo eWallet si las recargas no respetan los límites o si los puntos
+        enviados por el POS superan los que otorgan las recargas validadas."""
+        error = self._ewallet_get_topup_error() or self._ewallet_get_coupon_points_error(coupon_data)
+        if error:
+            raise UserError(error)
+        return super().confirm_coupon_programs(coupon_data)
+
+    # ── Liquidación de pagos eWallet en la sincronización de la orden ──
+
+    @api.model
+    def sync_from_ui(self, orders):
+        # Una sola orden es la validación en línea desde la pantalla de pago: si el monedero
+        # no cubre el pago, la orden se rechaza y el cajero ve el error al validar.
+        # Los lotes (reenvíos tras trabajar sin conexión) liquidan cada orden por separado.
+        if len(orders) == 1:
+            self = self.with_context(ewallet_strict_settlement=True)
+        return super(PosOrder, self).sync_from_ui(orders)
+
+    @api.model
+    def _process_order(self, order, existing_order):
+        order_id = super()._process_order(order, existing_order)
+        self.browse(order_id)._ewallet_try_settle_payments()
+        return order_id
+
+    def _ewallet_try_settle_payments(self):
+        """Liquida los pagos eWallet en un savepoint propio de cada orden.
+
+        sync_from_ui procesa todo el lote en una sola transacción: un monedero sin saldo
+        o inactivo no debe revertir las demás órdenes ni bloquear los reintentos del
+        terminal. La orden queda registrada, marcada como pendiente de liquidar y el POS
+        avisa al cajero al recibirla. Con el contexto ewallet_strict_settlement (una orden
+        validada en línea) el error se propaga y la orden se rechaza.
+        """
+        for order in self:
+            try:
+                with self.env.cr.savepoint():
+                    settled = order._ewallet_settle_payments()
+            except UserError as e:
+                if self.env.context.get('ewallet_strict_settlement'):
+                    raise
+                _logger.warning("Pago eWallet de la orden %s sin liquidar: %s", order.name, e)
+                order.write({
+                    'ewallet_settlement_state': 'failed',
+                    'ewallet_settlement_error': str(e),
+                })
+                continue
+            if settled:
+                order.write({
+                    'ewallet_settlement_state': 'settled',
+                    'ewallet_settlement_error': False,
+                })
+
+    def action_ewallet_retry_settlement(self):
+        """Reintenta la liquidación de órdenes pendientes (p. ej. tras recargar el monedero)."""
+        self.filtered(lambda order: order.ewallet_settlement_state == 'failed')._ewallet_try_settle_payments()
+
+    def _ewallet_settle_payments(self):
+        """Descuenta de los monederos los pagos eWallet de la orden dentro de la transacción de sincronización.
+
+        La clave de idempotencia por pago evita descontar dos veces si la orden se reenvía.
+        Lanza UserError si un pago eWallet no tiene monedero o el monedero no lo cubre.
+        Retorna True si la orden tiene pagos eWallet.
+        """
+        self.ensure_one()
+        if self.state in ('draft', 'cancel'):
+            return False
+        payments = self.payment_ids.filtered(lambda payment: payment.payment_method_id.is_ewallet)
+        if not payments:
+            return False
+        if any(not payment.ewallet_card_id for payment in payments):
+            raise UserError(_("La orden %s tiene un pago eWallet sin monedero asociado.", self.name))
+        keys = {payment: f'pos.payment:{payment.uuid}' for payment in payments}
+        settled_keys = set(self.env['loyalty.history'].sudo().search([
+            ('ewallet_idempotency_key', 'in', list(keys.values())),
+        ]).mapped('ewallet_idempotency_key'))
+
+        for payment, key in keys.items():
+            if key in settled_keys:
+                continue
+            card = payment.ewallet_card_id.sudo()
+            error = self._ewallet_check_card(card, check_pin=False)
+            if error:
+                raise UserError(error)
+            program = card.program_id
+            if card.wallet_type == 'owner':
+                discount_percent = program.owner_discount
+            else:
+                discount_percent = program.visitor_discount
+            result = self._ewallet_charge_card(
+                card, payment.amount, self.ewallet_concept, discount_percent, idempotency_key=key,
+            )
+            if not result['success']:
+                raise UserError(result['error'])
+        return True
+
     # ── Buscar monedero por código de barras (16 dígitos) ──
 
     @api.model
     def ewallet_search_by_barcode(self, barcode):
         """Busca un monedero por código de 16 dígitos y retorna datos del cliente asociado."""
-        card = self.env['loyalty.card'].sudo().search([
-            ('code', '=', barcode),
-            ('program_id.is_ewallet_program', '=', True),
-        ], limit=1)
+        # El código es único: la búsqueda usa su índice y el programa se comprueba en memoria
+        card = self.env['loyalty.card'].sudo().search([('code', '=', barcode)], limit=1)
 
-        if not card:
+        if not card or not card.program_id.is_ewallet_program:
             return {'found': False, 'error': _("No se encontró monedero con ese código.")}
 
         if not card.partner_id:
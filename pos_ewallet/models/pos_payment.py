@@ -0,0 +1,19 @@
+from odoo import api, fields, models
+
+class PosPayment(models.Model):
+    _inherit = 'pos.payment'
+
+    ewallet_card_id = fields.Many2one(
+        comodel_name='loyalty.card',
+        string="Monedero eWallet",
+        readonly=True,
+        index='btree_not_null',
+    )
+
+    @api.model
+    def _load_pos_data_fields(self, config):
+        fields = super()._load_pos_data_fields(config)
+        # Una lista vacía significa que se cargan todos los campos
+        if fields:
+            fields.append('ewallet_card_id')
+        return fields
@@ -0,0 +1,19 @@
+from odoo import api, fields, models
+
+class PosPaymentMethod(models.Model):
+    _inherit = 'pos.payment.method'
+
+    is_ewallet = fields.Boolean(
+        string="Pago con eWallet",
+        default=False,
+        help="Los pagos con este método se descuentan del monedero eWallet del cliente "
+             "al sincronizar la orden, en la misma transacción.",
+    )
+
+    @api.model
+    def _load_pos_data_fields(self, config):
+        fields = super()._load_pos_data_fields(config)
+        # Una lista vacía significa que se cargan todos los campos
+        if fields:
+            fields.append('is_ewallet')
+        return fields
@@ -0,0 +1,9 @@
+from odoo import fields, models
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    pos_ewallet_lazy_cards = fields.Boolean(
+        related='pos_config_id.ewallet_lazy_cards',
+        readonly=False,
+    )
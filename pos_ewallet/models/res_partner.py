@@ -1,6 +1,6 @@
 from odoo import _, api, fields, models
 from odoo.exceptions import ValidationError
-from werkzeug.security import generate_password_hash, check_password_hash
+from odoo.tools import SQL
 
 class ResPartner(models.Model):
     _inherit = 'res.partner'
@@ -8,8 +8,7 @@ class ResPartner(models.Model):
     ewallet_username = fields.Char(
         string="Usuario eWallet",
         copy=False,
-        index=True,
-        help="Nombre de usuario para acceder al portal eWallet.",
+        help="Nombre de usuario para acceder al portal eWallet. Se guarda en minúsculas.",
     )
     ewallet_password_hash = fields.Char(
         string="Contraseña eWallet (hash)",
@@ -24,41 +23,77 @@ class ResPartner(models.Model):
         domain=[('program_id.is_ewallet_program', '=', True)],
     )
 
-    # ── Restricción: usuario eWallet único ──
-
-    @api.constrains('ewallet_username')
-    def _check_ewallet_username_unique(self):
-        for partner in self:
-            if partner.ewallet_username:
-                count = self.sudo().search_count([
-                    ('ewallet_username', '=', partner.ewallet_username),
-                    ('id', '!=', partner.id),
-                ])
-                if count > 0:
-                    raise ValidationError(
-                        _("El nombre de usuario eWallet '%s' ya está en uso.",
-                          partner.ewallet_username)
-                    )
+    # ── Restricción: usuario eWallet único (sin distinguir mayúsculas) ──
+
+    _ewallet_username_unique = models.UniqueIndex(
+        '(lower(ewallet_username)) WHERE ewallet_username IS NOT NULL',
+        "El nombre de usuario eWallet ya está en uso.",
+    )
+
+    # ── Normalización y búsqueda de usuario eWallet ──
+
+    @api.model
+    def _normalize_ewallet_username(self, username):
+        return (username or '').strip().lower() or False
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if 'ewallet_username' in vals:
+                vals['ewallet_username'] = self._normalize_ewallet_username(vals['ewallet_username'])
+        return super().create(vals_list)
+
+    def write(self, vals):
+        if 'ewallet_username' in vals:
+            vals['ewallet_username'] = self._normalize_ewallet_username(vals['ewallet_username'])
+        return super().write(vals)
+
+    @api.model
+    def _find_ewallet_partner(self, username):
+        """Retorna el cliente activo con ese usuario eWallet, o un recordset vacío.
+
+        Sin caché: el endpoint público /ewallet/check-user recibe nombres arbitrarios y
+        la búsqueda ya es una sola consulta sobre el índice de lower(ewallet_username).
+        """
+        username = self._normalize_ewallet_username(username)
+        if not username:
+            return self.browse()
+        self.env.cr.execute(SQL(
+            """
+            SELECT id
+              FROM res_partner
+             WHERE lower(ewallet_username) = %s AND active
+             LIMIT 1
+            """,
+            username,
+        ))
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
 
     # ── Gestión de contraseña del portal eWallet ──
 
     def set_ewallet_password(self, password):
-        """Establece la contraseña del portal eWallet con hash seguro."""
+        """Establece la contraseña del portal eWallet con el hash configurado."""
         self.ensure_one()
         if not password or len(password) < 4:
             raise ValidationError(
                 _("La contraseña debe tener al menos 4 caracteres.")
             )
         self.sudo().write({
-            'ewallet_password_hash': generate_password_hash(password),
+            'ewallet_password_hash': self.env['ewallet.credential']._hash_secret(password),
         })
 
     def verify_ewallet_password(self, password):
-        """Verifica la contraseña contra el hash almacenado."""
+        """Verifica la contraseña contra el hash almacenado; si el método configurado cambió, la rehashea."""
         self.ensure_one()
         if not self.ewallet_password_hash:
             return False
-        return check_password_hash(self.ewallet_password_hash, password or '')
+        valid, new_hash = self.env['ewallet.credential']._check_secret(
+            self.ewallet_password_hash, password
+        )
+        if new_hash:
+            self.sudo().write({'ewallet_password_hash': new_hash})
+        return valid
 
     # ── Acceso rápido a monederos del cliente ──
 
@@ -4,11 +4,17 @@ import { Component, useState } from "@odoo/owl";
 import { usePos } from "@point_of_sale/app/hooks/pos_hook";
 import { _t } from "@web/core/l10n/translation";
 import { useService } from "@web/core/utils/hooks";
+import { ConnectionLostError } from "@web/core/network/rpc";
+import { uuidv4 } from "@point_of_sale/utils";
 
 /**
  * Popup de pago con eWallet.
  * Muestra resumen de la orden con descuento aplicado, solicita concepto y PIN,
- * y procesa la deducción de saldo vía RPC.
+ * y procesa validación de PIN y deducción de saldo en una sola llamada RPC.
+ * Sin conexión, si el programa no exige PIN, el cobro se encola en el POS y se
+ * sincroniza al recuperarla; con PIN se requiere conexión para validarlo antes de la venta.
+ * Con un método de pago eWallet configurado, solo valida el PIN y agrega la línea
+ * de pago: el descuento del saldo ocurre al sincronizar la orden.
  */
 export class EwalletPaymentPopup extends Component {
     static template = "pos_ewallet.EwalletPaymentPopup";
@@ -16,6 +22,7 @@ export class EwalletPaymentPopup extends Component {
         order: Object,
         wallet: Object,
         program: Object,
+        paymentMethod: { type: [Object, { value: null }], optional: true },
         close: Function,
     };
 
@@ -29,6 +36,8 @@ export class EwalletPaymentPopup extends Component {
             processing: false,
             pinRequired: this.props.program?.require_pin ?? true,
         });
+        // Clave única del cobro: los reintentos desde este popup nunca cobran dos veces
+        this.idempotencyKey = uuidv4();
     }
 
     get orderTotal() {
@@ -88,28 +97,22 @@ export class EwalletPaymentPopup extends Component {
 
         this.state.processing = true;
 
-        try {
-            if (this.state.pinRequired) {
-                const pinResult = await this.pos.data.call(
-                    "pos.order",
-                    "ewallet_validate_pin",
-                    [this.props.wallet.id, this.state.pin]
-                );
-                if (!pinResult.valid) {
-                    this.state.error = pinResult.error || _t("PIN incorrecto.");
-                    this.state.processing = false;
-                    return;
-                }
-            }
+        if (this.props.paymentMethod) {
+            await this.addNativePayment();
+            return;
+        }
 
+        try {
+            // PIN, descuento y cobro se resuelven en el servidor en una sola llamada
             const payResult = await this.pos.data.call(
                 "pos.order",
-                "ewallet_process_payment",
+                "ewallet_pay",
                 [
                     this.props.wallet.id,
                     this.orderTotal,
                     this.state.concept,
-                    this.discountPercent,
+                    this.state.pinRequired ? this.state.pin : null,
+                    this.idempotencyKey,
                 ]
             );
 
@@ -122,11 +125,69 @@ export class EwalletPaymentPopup extends Component {
             this.props.wallet.points = payResult.remaining_balance;
             this.props.close({ paid: true, result: payResult });
         } catch (error) {
+            if (error instanceof ConnectionLostError) {
+                // El PIN no se guarda en el navegador: sin conexión no puede validarse
+                if (!this.state.pinRequired) {
+                    this.queueOfflineCharge();
+                    return;
+                }
+                this.state.error = _t("Se requiere conexión para validar el PIN del monedero.");
+                this.state.processing = false;
+                return;
+            }
             this.state.error = error.message || _t("Error de comunicación con el servidor.");
             this.state.processing = false;
         }
     }
 
+    async addNativePayment() {
+        try {
+            if (this.state.pinRequired) {
+                const pinResult = await this.pos.data.call("pos.order", "ewallet_validate_pin", [
+                    this.props.wallet.id,
+                    this.state.pin,
+                ]);
+                if (!pinResult.valid) {
+                    this.state.error = pinResult.error || _t("PIN incorrecto.");
+                    this.state.processing = false;
+                    return;
+                }
+            }
+        } catch (error) {
+            // El PIN nunca se valida ni se guarda en el navegador
+            this.state.error =
+                error instanceof ConnectionLostError
+                    ? _t("Se requiere conexión para validar el PIN del monedero.")
+                    : error.message || _t("Error de comunicación con el servidor.");
+            this.state.processing = false;
+            return;
+        }
+
+        const order = this.props.order;
+        order.ewallet_concept = this.state.concept;
+        const line = order.addPaymentline(this.props.paymentMethod);
+        if (!line) {
+            this.state.error = _t("No se pudo agregar el pago con eWallet.");
+            this.state.processing = false;
+            return;
+        }
+        line.setAmount(this.orderTotal);
+        line.update({ ewallet_card_id: this.props.wallet });
+        this.props.close({ paid: true, native: true });
+    }
+
+    queueOfflineCharge() {
+        this.pos.ewalletQueueCharge({
+            idempotency_key: this.idempotencyKey,
+            card_id: this.props.wallet.id,
+            amount: this.orderTotal,
+            concept: this.state.concept,
+            expected_charge: this.amountToCharge,
+        });
+        this.props.wallet.points = this.walletBalance - this.amountToCharge;
+        this.props.close({ paid: true, queued: true });
+    }
+
     cancel() {
         this.props.close(null);
     }
@@ -24,7 +24,8 @@ export class EwalletUsernamePopup extends Component {
     }
 
     async confirm() {
-        const username = this.state.username.trim();
+        // El servidor guarda el usuario normalizado en minúsculas
+        const username = this.state.username.trim().toLowerCase();
         if (!username) {
             this.state.error = _t("Debe ingresar un nombre de usuario.");
             return;
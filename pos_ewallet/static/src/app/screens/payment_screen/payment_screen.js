@@ -0,0 +1,15 @@
+/** @odoo-module */
+
+import { patch } from "@web/core/utils/patch";
+import { PaymentScreen } from "@point_of_sale/app/screens/payment_screen/payment_screen";
+
+patch(PaymentScreen.prototype, {
+    setup() {
+        super.setup(...arguments);
+        // El pago eWallet solo se agrega desde el popup eWallet, que asocia el monedero
+        // y valida el PIN; no se ofrece como método directo en la pantalla de pago.
+        this.payment_methods_from_config = this.payment_methods_from_config.filter(
+            (pm) => !pm.is_ewallet
+        );
+    },
+});
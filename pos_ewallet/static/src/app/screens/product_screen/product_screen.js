@@ -6,7 +6,7 @@ import { _t } from "@web/core/l10n/translation";
 
 patch(ProductScreen.prototype, {
     /**
-     * Intercepta códigos de barras de 16 dígitos como tarjetas eWallet.
+     * Intercepta códigos de barras de 16 dígitos (regla de nomenclatura eWallet) como tarjetas eWallet.
      * Si encuentra un monedero asociado, selecciona automáticamente al cliente.
      */
     async _barcodePartnerAction(code) {
@@ -14,11 +14,7 @@ patch(ProductScreen.prototype, {
 
         if (/^\d{16}$/.test(barcodeStr)) {
             try {
-                const result = await this.pos.data.call(
-                    "pos.order",
-                    "ewallet_search_by_barcode",
-                    [barcodeStr]
-                );
+                const result = await this.pos.ewalletResolveBarcode(barcodeStr);
 
                 if (result.found && result.partner_id) {
                     let partner = this.pos.models["res.partner"].get(result.partner_id);
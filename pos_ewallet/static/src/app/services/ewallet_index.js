@@ -0,0 +1,76 @@
+/** @odoo-module */
+
+/**
+ * Índice eWallet del POS: programa, productos de recarga, método de pago y
+ * monederos por código y por cliente. Las consultas por línea de orden son O(1)
+ * y los monederos se agregan o quitan uno a uno a medida que el modelo
+ * loyalty.card los crea, actualiza o elimina, sin reconstruir el índice.
+ */
+export class EwalletIndex {
+    constructor({ program = null, ewalletProduct = null, topupProductIds = new Set(), paymentMethod = null } = {}) {
+        this.program = program;
+        this.ewalletProduct = ewalletProduct;
+        this.topupProductIds = topupProductIds;
+        this.paymentMethod = paymentMethod;
+        this.activeWalletByPartner = new Map();
+        this.cardByCode = new Map();
+        // id de monedero → claves con las que quedó indexado, para poder retirarlo
+        this._entries = new Map();
+    }
+
+    static fromModels(models, config) {
+        const program = models["loyalty.program"].find((p) => p.is_ewallet_program) || null;
+        const topupProductIds = new Set();
+        for (const rule of program?.rule_ids || []) {
+            for (const product of rule.product_ids || []) {
+                topupProductIds.add(product.id);
+            }
+        }
+        const index = new EwalletIndex({
+            program,
+            ewalletProduct:
+                models["product.product"].find((p) => p.product_tmpl_id?.is_ewallet_product) ||
+                null,
+            topupProductIds,
+            paymentMethod: config.payment_method_ids?.find((pm) => pm.is_ewallet) || null,
+        });
+        for (const card of models["loyalty.card"].filter((c) => c.program_id?.is_ewallet_program)) {
+            index.addCard(card);
+        }
+        return index;
+    }
+
+    addCard(card) {
+        if (!card) {
+            return;
+        }
+        this.removeCard(card.id);
+        if (!card.program_id?.is_ewallet_program) {
+            return;
+        }
+        const entry = { code: card.code || null, partnerId: null };
+        if (entry.code) {
+            this.cardByCode.set(entry.code, card);
+        }
+        const partnerId = card.partner_id?.id;
+        if (card.wallet_active && partnerId && !this.activeWalletByPartner.has(partnerId)) {
+            this.activeWalletByPartner.set(partnerId, card);
+            entry.partnerId = partnerId;
+        }
+        this._entries.set(card.id, entry);
+    }
+
+    removeCard(cardId) {
+        const entry = this._entries.get(cardId);
+        if (!entry) {
+            return;
+        }
+        if (entry.code && this.cardByCode.get(entry.code)?.id === cardId) {
+            this.cardByCode.delete(entry.code);
+        }
+        if (entry.partnerId && this.activeWalletByPartner.get(entry.partnerId)?.id === cardId) {
+            this.activeWalletByPartner.delete(entry.partnerId);
+        }
+        this._entries.delete(cardId);
+    }
+}
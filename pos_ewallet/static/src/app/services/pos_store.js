@@ -5,46 +5,294 @@ import { PosStore } from "@point_of_sale/app/services/pos_store";
 import { _t } from "@web/core/l10n/translation";
 import { AlertDialog } from "@web/core/confirmation_dialog/confirmation_dialog";
 import { makeAwaitable } from "@point_of_sale/app/utils/make_awaitable_dialog";
+import { ConnectionLostError } from "@web/core/network/rpc";
+import { NumberPopup } from "@point_of_sale/app/components/popups/number_popup/number_popup";
+import { parseFloat as parseLocalizedFloat } from "@web/views/fields/parsers";
 import { EwalletPaymentPopup } from "@pos_ewallet/app/components/ewallet_payment_popup/ewallet_payment_popup";
+import { EwalletIndex } from "@pos_ewallet/app/services/ewallet_index";
+
+// Vigencia de los monederos consultados bajo demanda antes de volver a pedirlos
+const EWALLET_CARD_TTL_MS = 5 * 60 * 1000;
 
 patch(PosStore.prototype, {
 
+    // ── Índice eWallet: programa, productos de recarga y monedero activo por cliente ──
+    // Se construye una vez; los monederos se mantienen con los eventos del modelo
+    // loyalty.card y solo se descarta entero si cambia el programa o sus productos.
+
+    _getEwalletIndex() {
+        if (!this._ewalletIndex) {
+            this._ewalletIndex = EwalletIndex.fromModels(this.models, this.config);
+        }
+        return this._ewalletIndex;
+    },
+
+    _watchEwalletModels() {
+        // Un cambio en el programa (reglas, productos de recarga) sí requiere reconstruirlo
+        this.models["loyalty.program"].addEventListener("update", () => this._invalidateEwalletIndex());
+        const Card = this.models["loyalty.card"];
+        Card.addEventListener("create", ({ ids }) => {
+            for (const id of ids || []) {
+                this._ewalletIndex?.addCard(Card.get(id));
+            }
+        });
+        Card.addEventListener("update", ({ id }) => this._ewalletIndex?.addCard(Card.get(id)));
+        Card.addEventListener("delete", ({ id }) => this._ewalletIndex?.removeCard(id));
+    },
+
+    _invalidateEwalletIndex() {
+        this._ewalletIndex = null;
+    },
+
     // ── Utilidades internas ──
 
     _getEwalletProgram() {
-        return this.models["loyalty.program"].find((p) => p.is_ewallet_program);
+        return this._getEwalletIndex().program;
     },
 
     _getEwalletProduct() {
-        return this.models["product.product"].find(
-            (p) => p.product_tmpl_id?.is_ewallet_product
-        );
+        return this._getEwalletIndex().ewalletProduct;
     },
 
     _isEwalletTopupProduct(product) {
-        const program = this._getEwalletProgram();
-        if (!program || !program.rule_ids?.length) {
-            return false;
+        return Boolean(product) && this._getEwalletIndex().topupProductIds.has(product.id);
+    },
+
+    _getPartnerActiveWallet(partner) {
+        if (!partner) {
+            return null;
         }
-        for (const rule of program.rule_ids) {
-            if (rule.product_ids?.some((p) => p.id === product.id)) {
-                return true;
+        return this._getEwalletIndex().activeWalletByPartner.get(partner.id) || null;
+    },
+
+    // ── Saldos en tiempo real (bus) ──
+
+    async setup() {
+        await super.setup(...arguments);
+        this._watchEwalletModels();
+        this.data.connectWebSocket("EWALLET_CARD_UPDATE", (cards) => this._applyEwalletCardUpdates(cards));
+    },
+
+    // Aplica los deltas publicados por el servidor a los monederos ya cargados;
+    // los que este terminal no conoce se ignoran.
+    _applyEwalletCardUpdates(cards) {
+        for (const { id, points, wallet_active } of cards || []) {
+            const card = this.models["loyalty.card"].get(id);
+            if (!card) {
+                continue;
             }
+            card.update({ points, wallet_active });
+            this._ewalletIndex?.addCard(card);
         }
-        return false;
     },
 
-    _getPartnerActiveWallet(partner) {
-        if (!partner) {
+    // ── Resolución de códigos de tarjeta escaneados ──
+
+    // Primero el índice local; si la tarjeta no está cargada se consulta al servidor
+    // y el resultado encontrado se conserva para los siguientes escaneos.
+    async ewalletResolveBarcode(code) {
+        const card = this._getEwalletIndex().cardByCode.get(code);
+        if (card?.partner_id) {
+            return { found: true, partner_id: card.partner_id.id, card_id: card.id };
+        }
+        this._ewalletBarcodeCache ??= new Map();
+        const cached = this._ewalletBarcodeCache.get(code);
+        if (cached) {
+            return cached;
+        }
+        const result = await this.data.call("pos.order", "ewallet_search_by_barcode", [code]);
+        if (result.found) {
+            this._ewalletBarcodeCache.set(code, result);
+        }
+        return result;
+    },
+
+    // ── Monto de recarga ingresado por el cajero ──
+
+    async _askEwalletTopupAmount() {
+        const program = this._getEwalletProgram();
+        const min = program?.topup_min_amount || 0;
+        const max = program?.topup_max_amount || 0;
+        const step = program?.topup_step || 0;
+
+        const payload = await makeAwaitable(this.dialog, NumberPopup, {
+            title: _t("Monto de la recarga"),
+            startingValue: min ? String(min) : "",
+        });
+        if (payload === undefined || payload === null || payload === "") {
+            return null;
+        }
+
+        let amount;
+        try {
+            amount = parseLocalizedFloat(String(payload));
+        } catch {
+            amount = NaN;
+        }
+        const ratio = step ? amount / step : 0;
+        let error = null;
+        if (!Number.isFinite(amount) || amount <= 0) {
+            error = _t("Ingrese un monto de recarga válido.");
+        } else if (min && amount < min) {
+            error = _t("La recarga mínima es %s.", this.env.utils.formatCurrency(min));
+        } else if (max && amount > max) {
+            error = _t("La recarga máxima es %s.", this.env.utils.formatCurrency(max));
+        } else if (step && Math.abs(ratio - Math.round(ratio)) > 1e-6) {
+            error = _t("El monto de la recarga debe ser múltiplo de %s.", this.env.utils.formatCurrency(step));
+        }
+        if (error) {
+            this.dialog.add(AlertDialog, {
+                title: _t("Monto no permitido"),
+                body: error,
+            });
             return null;
         }
-        const cards = this.models["loyalty.card"].filter(
-            (c) =>
-                c.partner_id?.id === partner.id &&
-                c.program_id?.is_ewallet_program &&
-                c.wallet_active
+        return amount;
+    },
+
+    // ── Carga diferida de monederos (config.ewallet_lazy_cards) ──
+
+    async _ensurePartnerEwallets(partner) {
+        if (!partner || !this.config.ewallet_lazy_cards) {
+            return;
+        }
+        this._ewalletFetchedAt ??= new Map();
+        const fetchedAt = this._ewalletFetchedAt.get(partner.id);
+        if (fetchedAt && Date.now() - fetchedAt < EWALLET_CARD_TTL_MS) {
+            return;
+        }
+        try {
+            const cards = await this.data.searchRead("loyalty.card", [
+                ["partner_id", "=", partner.id],
+                ["program_id.is_ewallet_program", "=", true],
+            ]);
+            this._ewalletFetchedAt.set(partner.id, Date.now());
+            for (const card of cards || []) {
+                this._ewalletIndex?.addCard(card);
+            }
+        } catch (error) {
+            // Sin conexión se trabaja con los monederos ya cargados
+            if (!(error instanceof ConnectionLostError)) {
+                throw error;
+            }
+        }
+    },
+
+    setPartnerToCurrentOrder(partner) {
+        const result = super.setPartnerToCurrentOrder(...arguments);
+        this._ensurePartnerEwallets(partner).catch(() => { });
+        return result;
+    },
+
+    // ── Cola offline de cobros eWallet ──
+
+    _ewalletQueueStorageKey() {
+        return `pos_ewallet.pending_charges.${this.config.id}`;
+    },
+
+    _ewalletLoadQueue() {
+        if (!this.ewalletPendingCharges) {
+            try {
+                this.ewalletPendingCharges = JSON.parse(
+                    localStorage.getItem(this._ewalletQueueStorageKey()) || "[]"
+                );
+            } catch {
+                this.ewalletPendingCharges = [];
+            }
+        }
+        return this.ewalletPendingCharges;
+    },
+
+    _ewalletSaveQueue() {
+        // Solo se encolan cobros de programas sin PIN: nunca hay un PIN que guardar
+        localStorage.setItem(
+            this._ewalletQueueStorageKey(),
+            JSON.stringify(this.ewalletPendingCharges)
         );
-        return cards.length > 0 ? cards[0] : null;
+    },
+
+    ewalletQueueCharge(charge) {
+        this._ewalletLoadQueue().push(charge);
+        this._ewalletSaveQueue();
+        this.notification.add(
+            _t("Sin conexión: el cobro eWallet se sincronizará al recuperar la red."),
+            { type: "warning" }
+        );
+    },
+
+    // Envía todos los cobros pendientes en una sola llamada; el servidor ignora
+    // los que ya registró gracias a su clave de idempotencia.
+    async ewalletFlushCharges() {
+        const batch = [...this._ewalletLoadQueue()];
+        if (!batch.length || this._ewalletFlushing) {
+            return;
+        }
+        this._ewalletFlushing = true;
+        try {
+            const results = await this.data.call("pos.order", "ewallet_sync_charges", [batch]);
+            const settled = new Set();
+            for (const result of results) {
+                const charge = batch.find((c) => c.idempotency_key === result.idempotency_key);
+                if (!charge || result.retry) {
+                    continue;
+                }
+                settled.add(charge.idempotency_key);
+                const card = this.models["loyalty.card"].get(charge.card_id);
+                if (result.success) {
+                    if (card) {
+                        card.points = result.remaining_balance;
+                    }
+                } else {
+                    if (card) {
+                        card.points += charge.expected_charge;
+                    }
+                    this.notification.add(
+                        _t("Cobro eWallet rechazado (%s): %s", charge.concept, result.error),
+                        { type: "danger" }
+                    );
+                }
+            }
+            this.ewalletPendingCharges = this.ewalletPendingCharges.filter(
+                (c) => !settled.has(c.idempotency_key)
+            );
+            this._ewalletSaveQueue();
+        } catch (error) {
+            if (!(error instanceof ConnectionLostError)) {
+                console.warn("Error al sincronizar cobros eWallet:", error);
+            }
+        } finally {
+            this._ewalletFlushing = false;
+        }
+    },
+
+    async syncAllOrders(options = {}) {
+        await this.ewalletFlushCharges();
+        const result = await super.syncAllOrders(...arguments);
+        this._notifyEwalletSettlementFailures(result);
+        return result;
+    },
+
+    // Las órdenes de un lote offline cuyo monedero no pudo debitarse se registran en el
+    // servidor como pendientes de liquidar; el cajero debe saberlo para cobrar de otra forma.
+    _notifyEwalletSettlementFailures(orders) {
+        this._ewalletNotifiedFailures ??= new Set();
+        for (const order of Array.isArray(orders) ? orders : []) {
+            if (
+                order?.ewallet_settlement_state !== "failed" ||
+                this._ewalletNotifiedFailures.has(order.uuid)
+            ) {
+                continue;
+            }
+            this._ewalletNotifiedFailures.add(order.uuid);
+            this.dialog.add(AlertDialog, {
+                title: _t("Pago eWallet sin liquidar"),
+                body: _t(
+                    "La orden %s se registró, pero el monedero no pudo debitarse: %s",
+                    order.pos_reference || order.name,
+                    order.ewallet_settlement_error || ""
+                ),
+            });
+        }
     },
 
     // ── Override pay(): bloquear sin cliente + popup de pago eWallet ──
@@ -64,6 +312,7 @@ patch(PosStore.prototype, {
         }
 
         const partner = order.getPartner();
+        await this._ensurePartnerEwallets(partner);
         const activeWallet = this._getPartnerActiveWallet(partner);
         const hasRegularProducts = order.getOrderlines().some(
             (line) =>
@@ -78,6 +327,7 @@ patch(PosStore.prototype, {
                 order: order,
                 wallet: activeWallet,
                 program: this._getEwalletProgram(),
+                paymentMethod: this._getEwalletIndex().paymentMethod,
             });
             if (result?.paid) {
                 return super.pay(...arguments);
@@ -157,6 +407,7 @@ patch(PosStore.prototype, {
                 });
                 return;
             }
+            await this._ensurePartnerEwallets(partner);
             const activeWallet = this._getPartnerActiveWallet(partner);
             if (!activeWallet) {
                 this.dialog.add(AlertDialog, {
@@ -165,6 +416,14 @@ patch(PosStore.prototype, {
                 });
                 return;
             }
+
+            // Un único producto de recarga: el cajero ingresa el monto y la regla lo acredita 1:1
+            const amount = await this._askEwalletTopupAmount();
+            if (amount === null) {
+                return;
+            }
+            vals = { ...vals, price_unit: amount, price_type: "manual" };
+            opt = { ...opt, merge: false };
         }
 
         return super.addLineToCurrentOrder(vals, opt, configure);
@@ -1,6 +1,7 @@
 /**
  * Portal eWallet — JavaScript standalone
- * Auto-logout por inactividad, flip cards, animaciones de entrada, auto-cierre de alertas
+ * Auto-logout por inactividad, flip cards, animaciones de entrada, auto-cierre de alertas,
+ * scroll infinito del historial
  */
 (function () {
     'use strict';
@@ -108,6 +109,82 @@
         });
     }
 
+    // -- Historial: scroll infinito con cursor (create_date, id) --
+
+    function buildHistoryRow(line) {
+        var row = document.createElement('tr');
+        var cells = [
+            { text: line.date },
+            { text: line.description },
+            { text: line.issued ? '+$' + line.issued.toFixed(2) : '', cls: 'ew-text-end ew-positive' },
+            { text: line.used ? '-$' + line.used.toFixed(2) : '', cls: 'ew-text-end ew-negative' },
+        ];
+        cells.forEach(function (cell) {
+            var td = document.createElement('td');
+            td.textContent = cell.text;
+            if (cell.cls) {
+                td.className = cell.cls;
+            }
+            row.appendChild(td);
+        });
+        return row;
+    }
+
+    function setupHistoryScroll() {
+        var sentinel = document.querySelector('.ew-history-sentinel');
+        var tbody = document.querySelector('.ew-history-body');
+        if (!sentinel || !tbody || !('IntersectionObserver' in window)) {
+            return;
+        }
+        var loading = false;
+
+        function loadNextPage() {
+            if (loading) {
+                return;
+            }
+            loading = true;
+            var params = new URLSearchParams({
+                before_date: sentinel.dataset.beforeDate,
+                before_id: sentinel.dataset.beforeId,
+            });
+            fetch(sentinel.dataset.url + '?' + params.toString(), { credentials: 'same-origin' })
+                .then(function (response) {
+                    if (!response.ok) {
+                        throw new Error(response.status);
+                    }
+                    return response.json();
+                })
+                .then(function (data) {
+                    data.lines.forEach(function (line) {
+                        tbody.appendChild(buildHistoryRow(line));
+                    });
+                    if (data.next_cursor) {
+                        sentinel.dataset.beforeDate = data.next_cursor.date;
+                        sentinel.dataset.beforeId = data.next_cursor.id;
+                        loading = false;
+                        // El observer no vuelve a notificar si el sentinel sigue visible
+                        if (sentinel.getBoundingClientRect().top < window.innerHeight + 200) {
+                            loadNextPage();
+                        }
+                    } else {
+                        observer.disconnect();
+                        sentinel.remove();
+                    }
+                })
+                .catch(function () {
+                    observer.disconnect();
+                    sentinel.textContent = 'No se pudieron cargar mas movimientos.';
+                });
+        }
+
+        var observer = new IntersectionObserver(function (entries) {
+            if (entries[0].isIntersecting) {
+                loadNextPage();
+            }
+        }, { rootMargin: '200px' });
+        observer.observe(sentinel);
+    }
+
     // -- Inicializacion --
 
     function init() {
@@ -115,6 +192,7 @@
         setupFlipCards();
         setupAnimations();
         setupAlertDismiss();
+        setupHistoryScroll();
     }
 
     if (document.readyState === 'loading') {
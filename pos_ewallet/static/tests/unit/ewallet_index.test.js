@@ -0,0 +1,139 @@
+import { describe, expect, test } from "@odoo/hoot";
+import { EwalletIndex } from "@pos_ewallet/app/services/ewallet_index";
+
+const ORDER_LINES = 200;
+const LOADED_CARDS = 5000;
+const ROUNDS = 50;
+
+function makeModels() {
+    const program = { id: 1, is_ewallet_program: true };
+    const topupProducts = [{ id: 1000 }];
+    program.rule_ids = [{ product_ids: topupProducts }];
+    const products = Array.from({ length: ORDER_LINES }, (_, i) => ({
+        id: i + 1,
+        product_tmpl_id: { is_ewallet_product: i === 0 },
+    }));
+    const cards = Array.from({ length: LOADED_CARDS }, (_, i) => ({
+        id: i + 1,
+        code: String(1000000000000000 + i),
+        program_id: program,
+        partner_id: { id: i + 1 },
+        wallet_active: i % 2 === 0,
+    }));
+    return {
+        program,
+        products,
+        cards,
+        models: {
+            "loyalty.program": [program],
+            "loyalty.card": cards,
+            "product.product": [...products, ...topupProducts],
+        },
+    };
+}
+
+describe("EwalletIndex", () => {
+    test("mantiene los monederos al crear, actualizar y eliminar", () => {
+        const { models, cards, program } = makeModels();
+        const index = EwalletIndex.fromModels(models, { payment_method_ids: [] });
+        expect(index.activeWalletByPartner.get(1)).toBe(cards[0]);
+        expect(index.activeWalletByPartner.has(2)).toBe(false);
+
+        // Monedero cargado después de abrir la sesión (p. ej. creado por una recarga)
+        const card = { id: 99999, code: "9999999999999999", program_id: program, partner_id: { id: 42424 }, wallet_active: true };
+        index.addCard(card);
+        expect(index.activeWalletByPartner.get(42424)).toBe(card);
+        expect(index.cardByCode.get("9999999999999999")).toBe(card);
+
+        card.wallet_active = false;
+        index.addCard(card);
+        expect(index.activeWalletByPartner.has(42424)).toBe(false);
+        expect(index.cardByCode.get("9999999999999999")).toBe(card);
+
+        index.removeCard(card.id);
+        expect(index.cardByCode.has("9999999999999999")).toBe(false);
+    });
+
+    test("benchmark: orden de 200 líneas", () => {
+        const { models, products, cards } = makeModels();
+        const index = EwalletIndex.fromModels(models, { payment_method_ids: [] });
+        const lines = products.map((product) => ({ product_id: product }));
+
+        // Referencia: búsquedas lineales como antes del índice
+        const scanStart = performance.now();
+        let scanHits = 0;
+        for (let round = 0; round < ROUNDS; round++) {
+            for (const line of lines) {
+                const rule = models["loyalty.program"].find((p) => p.is_ewallet_program).rule_ids[0];
+                if (rule.product_ids.some((p) => p.id === line.product_id.id)) {
+                    scanHits++;
+                }
+                if (cards.find((c) => c.wallet_active && c.partner_id.id === line.product_id.id)) {
+                    scanHits++;
+                }
+            }
+        }
+        const scanMs = performance.now() - scanStart;
+
+        const indexStart = performance.now();
+        let indexHits = 0;
+        for (let round = 0; round < ROUNDS; round++) {
+            for (const line of lines) {
+                if (index.topupProductIds.has(line.product_id.id)) {
+                    indexHits++;
+                }
+                if (index.activeWalletByPartner.get(line.product_id.id)) {
+                    indexHits++;
+                }
+            }
+        }
+        const indexMs = performance.now() - indexStart;
+
+        expect(indexHits).toBe(scanHits);
+        console.info(
+            `EwalletIndex: ${ORDER_LINES} líneas × ${ROUNDS} renders, ` +
+                `búsqueda lineal ${scanMs.toFixed(2)} ms, índice ${indexMs.toFixed(2)} ms`
+        );
+    });
+
+    test("benchmark: arranque con monederos precargados frente a carga diferida", () => {
+        // Con carga diferida el POS arranca sin monederos y trae solo los de los clientes
+        // atendidos; se simula una sesión que atiende LAZY_FETCHED clientes.
+        const LAZY_FETCHED = 50;
+        const heap = () => performance.memory?.usedJSHeapSize;
+
+        const measure = (cardCount) => {
+            const heapBefore = heap();
+            const start = performance.now();
+            const { models } = makeModels();
+            models["loyalty.card"] = models["loyalty.card"].slice(0, cardCount);
+            const index = EwalletIndex.fromModels(models, { payment_method_ids: [] });
+            const elapsed = performance.now() - start;
+            const heapAfter = heap();
+            return {
+                index,
+                elapsed,
+                heapKb: heapBefore === undefined ? null : (heapAfter - heapBefore) / 1024,
+            };
+        };
+
+        const eager = measure(LOADED_CARDS);
+        const lazy = measure(0);
+        const { cards } = makeModels();
+        const fetchStart = performance.now();
+        for (const card of cards.slice(0, LAZY_FETCHED)) {
+            lazy.index.addCard(card);
+        }
+        const fetchMs = performance.now() - fetchStart;
+
+        expect(eager.index.cardByCode.size).toBe(LOADED_CARDS);
+        expect(lazy.index.cardByCode.size).toBe(LAZY_FETCHED);
+        console.info(
+            `EwalletIndex arranque: ${LOADED_CARDS} monederos precargados ${eager.elapsed.toFixed(2)} ms` +
+                (eager.heapKb === null ? "" : `, heap +${eager.heapKb.toFixed(0)} KB`) +
+                `; carga diferida ${lazy.elapsed.toFixed(2)} ms` +
+                (lazy.heapKb === null ? "" : `, heap +${lazy.heapKb.toFixed(0)} KB`) +
+                `, ${LAZY_FETCHED} monederos bajo demanda ${fetchMs.toFixed(2)} ms`
+        );
+    });
+});
@@ -0,0 +1,12 @@
+from . import test_ewallet_auth_throttle
+from . import test_ewallet_session_benchmark
+from . import test_ewallet_deduct_stress
+from . import test_ewallet_provisioning
+from . import test_ewallet_card_constraints_benchmark
+from . import test_ewallet_pay
+from . import test_ewallet_credential
+from . import test_ewallet_topup
+from . import test_ewallet_username
+from . import test_ewallet_session
+from . import test_ewallet_lazy_cards_benchmark
+from . import test_ewallet_codes
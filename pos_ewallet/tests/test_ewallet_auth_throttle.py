@@ -0,0 +1,178 @@
+import logging
+import os
+import statistics
+import threading
+import time
+from unittest.mock import patch
+
+from odoo import SUPERUSER_ID, api
+from odoo.sql_db import db_connect
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.pos_ewallet.models.ewallet_auth_attempt import VERIFY_LOCK_NAMESPACE
+
+_logger = logging.getLogger(__name__)
+
+STORM_CLIENTS = int(os.environ.get('EWALLET_STORM_CLIENTS', 24))
+STORM_POS_CALLS = int(os.environ.get('EWALLET_STORM_POS_CALLS', 200))
+STORM_WARMUP_SECONDS = 1.0
+STORM_PASSWORD = 'clave-segura'
+# Degradación tolerada de la latencia del POS durante la ráfaga
+STORM_MAX_SLOWDOWN = float(os.environ.get('EWALLET_STORM_MAX_SLOWDOWN', 3))
+STORM_LATENCY_SLACK = 0.005
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletAuthThrottle(TransactionCase):
+
+    def test_failures_block_key_until_reset(self):
+        Attempt = self.env['ewallet.auth.attempt']
+        for __ in range(4):
+            Attempt._add_failure('user:1', 'ip:10.0.0.1')
+        self.assertFalse(Attempt._is_blocked('user:1', 5))
+        Attempt._add_failure('user:1', 'ip:10.0.0.1')
+        self.assertTrue(Attempt._is_blocked('user:1', 5))
+        self.assertFalse(Attempt._is_blocked('ip:10.0.0.1', 20))
+        self.assertFalse(Attempt._is_blocked('user:2', 5))
+
+        Attempt._reset('user:1')
+        self.assertFalse(Attempt._is_blocked('user:1', 5))
+
+    def test_expired_failures_do_not_count(self):
+        Attempt = self.env['ewallet.auth.attempt']
+        Attempt._add_failure(*['user:3'] * 5)
+        self.assertTrue(Attempt._is_blocked('user:3', 5))
+        self.assertFalse(Attempt._is_blocked('user:3', 5, window_seconds=0))
+
+    def test_verify_throttled_counts_failures(self):
+        Attempt = self.env['ewallet.auth.attempt']
+        for __ in range(5):
+            self.assertEqual(Attempt._verify_throttled('user:4', 'ip:10.0.0.4', lambda: False), (False, None))
+        valid, error = Attempt._verify_throttled('user:4', 'ip:10.0.0.4', lambda: True)
+        self.assertFalse(valid)
+        self.assertTrue(error, "La cuenta bloqueada no debe llegar a verificar")
+        self.assertEqual(Attempt._verify_throttled('user:5', 'ip:10.0.0.4', lambda: True), (True, None))
+
+    def test_verify_slot_released(self):
+        Attempt = self.env['ewallet.auth.attempt']
+        slot = Attempt._acquire_verify_slot(concurrency=1, wait_seconds=0)
+        self.assertEqual(slot, 0)
+        Attempt._release_verify_slot(slot)
+        self.env.cr.execute(
+            "SELECT count(*) FROM pg_locks WHERE locktype = 'advisory' AND classid = %s AND pid = pg_backend_pid()",
+            [VERIFY_LOCK_NAMESPACE],
+        )
+        self.assertEqual(self.env.cr.fetchone()[0], 0)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletVerifyGateLoad(TransactionCase):
+    """Ráfaga de inicios de sesión del portal mientras el POS consulta el servidor.
+
+    Cada cliente de la ráfaga usa su propia conexión (como workers distintos) y pasa por
+    _verify_throttled con el hash real configurado. En paralelo se mide la latencia de
+    una consulta del POS y se compara con la latencia sin ráfaga.
+    """
+
+    def _new_env(self, cr):
+        return api.Environment(cr, SUPERUSER_ID, {})
+
+    def setUp(self):
+        super().setUp()
+        self.dbname = self.env.cr.dbname
+        self.concurrency = max(1, (os.cpu_count() or 2) // 2)
+        with db_connect(self.dbname).cursor() as cr:
+            env = self._new_env(cr)
+            partners = env['res.partner'].create([
+                {'name': f'Ráfaga eWallet {i}'} for i in range(STORM_CLIENTS)
+            ])
+            for partner in partners:
+                partner.set_ewallet_password(STORM_PASSWORD)
+            cr.commit()
+            self.partner_ids = partners.ids
+        self.addCleanup(self._cleanup)
+
+    def _cleanup(self):
+        with db_connect(self.dbname).cursor() as cr:
+            env = self._new_env(cr)
+            env['res.partner'].browse(self.partner_ids).unlink()
+            env['ewallet.auth.attempt'].search([('throttle_key', '=like', 'storm:%')]).unlink()
+            cr.commit()
+
+    def _pos_rpc(self, env):
+        env['product.product'].search_read([('available_in_pos', '=', True)], ['display_name', 'lst_price'], limit=80)
+        env['loyalty.card'].search_read(
+            [('program_id.is_ewallet_program', '=', True)], ['code', 'points', 'wallet_active'], limit=80,
+        )
+
+    def _pos_latencies(self):
+        samples = []
+        with db_connect(self.dbname).cursor() as cr:
+            env = self._new_env(cr)
+            for __ in range(STORM_POS_CALLS):
+                env.invalidate_all()
+                start = time.perf_counter()
+                self._pos_rpc(env)
+                samples.append(time.perf_counter() - start)
+                cr.rollback()
+        return statistics.median(samples), statistics.quantiles(samples, n=20)[-1]
+
+    def test_pos_latency_during_login_storm(self):
+        baseline_p50, baseline_p95 = self._pos_latencies()
+
+        lock = threading.Lock()
+        stop = threading.Event()
+        stats = {'running': 0, 'max_running': 0, 'verified': 0, 'failed': 0, 'rejected': 0}
+
+        def client(index):
+            partner_id = self.partner_ids[index]
+            with db_connect(self.dbname).cursor() as cr:
+                env = self._new_env(cr)
+                partner = env['res.partner'].browse(partner_id)
+                Attempt = env['ewallet.auth.attempt']
+                attempt = 0
+                while not stop.is_set():
+                    attempt += 1
+                    # Uno de cada cuatro intentos con contraseña errónea
+                    password = STORM_PASSWORD if attempt % 4 else 'incorrecta'
+
+                    def verify():
+                        with lock:
+                            stats['running'] += 1
+                            stats['max_running'] = max(stats['max_running'], stats['running'])
+                        try:
+                            return partner.verify_ewallet_password(password)
+                        finally:
+                            with lock:
+                                stats['running'] -= 1
+
+                    valid, error = Attempt._verify_throttled(
+                        f'storm:user:{partner_id}', f'storm:ip:{index}', verify,
+                    )
+                    cr.commit()
+                    with lock:
+                        stats['rejected' if error else 'verified' if valid else 'failed'] += 1
+
+        with patch.object(type(self.env['ewallet.auth.attempt']), '_get_verify_concurrency',
+                          lambda model: self.concurrency):
+            threads = [threading.Thread(target=client, args=(i,)) for i in range(STORM_CLIENTS)]
+            for thread in threads:
+                thread.start()
+            try:
+                time.sleep(STORM_WARMUP_SECONDS)
+                storm_p50, storm_p95 = self._pos_latencies()
+            finally:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+
+        _logger.info(
+            "ráfaga de inicios de sesión (%s clientes, %s turnos): %s verificados, %s fallidos, "
+            "%s rechazados; latencia POS p50 %.2f → %.2f ms, p95 %.2f → %.2f ms",
+            STORM_CLIENTS, self.concurrency, stats['verified'], stats['failed'], stats['rejected'],
+            baseline_p50 * 1000, storm_p50 * 1000, baseline_p95 * 1000, storm_p95 * 1000,
+        )
+        self.assertLessEqual(stats['max_running'], self.concurrency)
+        self.assertGreater(stats['verified'], 0)
+        self.assertLessEqual(storm_p50, baseline_p50 * STORM_MAX_SLOWDOWN + STORM_LATENCY_SLACK)
+        self.assertLessEqual(storm_p95, baseline_p95 * STORM_MAX_SLOWDOWN + STORM_LATENCY_SLACK)
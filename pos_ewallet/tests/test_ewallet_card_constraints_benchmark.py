@@ -0,0 +1,59 @@
+import logging
+import os
+import time
+
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+# Tamaño del lote mayor; los lotes intermedios se derivan de él
+BENCH_CARDS = int(os.environ.get('EWALLET_BENCH_CARDS', 50_000))
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletCardConstraintsBenchmark(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls.env['ewallet.provisioning']._provision()
+        cls.batch_sizes = sorted({max(BENCH_CARDS // 50, 1), max(BENCH_CARDS // 5, 1), BENCH_CARDS})
+
+    def _create_cards(self, size):
+        partners = self.env['res.partner'].create([
+            {'name': f'Cliente eWallet {i}'} for i in range(size)
+        ])
+        codes = self.env['loyalty.card']._generate_ewallet_codes(size)
+        start = time.perf_counter()
+        queries = self.env.cr.sql_log_count
+        cards = self.env['loyalty.card'].sudo().create([{
+            'program_id': self.program.id,
+            'partner_id': partner.id,
+            'code': code,
+            'wallet_type': 'owner',
+            'wallet_active': True,
+            'points': 0,
+        } for partner, code in zip(partners, codes)])
+        self.env.flush_all()
+        return cards, time.perf_counter() - start, self.env.cr.sql_log_count - queries
+
+    def _constraint_queries(self, cards):
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        cards._check_wallet_type_uniqueness()
+        cards._check_single_active_wallet()
+        return self.env.cr.sql_log_count - queries
+
+    def test_constraint_queries_do_not_scale_with_batch(self):
+        constraint_queries = {}
+        for size in self.batch_sizes:
+            cards, elapsed, create_queries = self._create_cards(size)
+            constraint_queries[size] = self._constraint_queries(cards)
+            _logger.info(
+                "creación de %s monederos: %.3f s, %s consultas (restricciones: %s)",
+                size, elapsed, create_queries, constraint_queries[size],
+            )
+        self.assertEqual(
+            len(set(constraint_queries.values())), 1,
+            f"Las restricciones deben costar lo mismo en cualquier lote: {constraint_queries}",
+        )
@@ -0,0 +1,64 @@
+from itertools import chain, repeat
+from unittest.mock import patch
+
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.pos_ewallet.models import loyalty_card
+
+EXISTING_CODE = 42
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletCodes(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls.env['ewallet.provisioning']._provision()
+        cls.existing = cls.env['loyalty.card'].sudo().create({
+            'program_id': cls.program.id,
+            'code': f'{EXISTING_CODE:016d}',
+            'wallet_type': 'visitor',
+            'points': 0,
+        })
+
+    def _patch_randbelow(self, values):
+        return patch.object(loyalty_card.secrets, 'randbelow', side_effect=values)
+
+    def test_generate_distinct_codes(self):
+        codes = self.env['loyalty.card']._generate_ewallet_codes(500)
+        self.assertEqual(len(codes), 500)
+        self.assertEqual(len(set(codes)), 500)
+        for code in codes:
+            self.assertEqual(len(code), 16)
+            self.assertTrue(code.isdigit())
+
+    def test_generate_skips_existing_codes(self):
+        # La primera ronda choca con un código existente y un duplicado; la segunda completa
+        with self._patch_randbelow([EXISTING_CODE, 7, 7, 8, 9]) as randbelow:
+            codes = self.env['loyalty.card']._generate_ewallet_codes(3)
+        self.assertEqual(sorted(codes), [f'{value:016d}' for value in (7, 8, 9)])
+        self.assertNotIn(self.existing.code, codes)
+        self.assertEqual(randbelow.call_count, 5)
+
+    def test_generate_completes_on_last_round(self):
+        # 99 rondas solo producen el código existente; la última encuentra uno libre
+        with self._patch_randbelow(chain(repeat(EXISTING_CODE, 99), [100])):
+            codes = self.env['loyalty.card']._generate_ewallet_codes(1)
+        self.assertEqual(codes, [f'{100:016d}'])
+
+    def test_generate_gives_up_after_max_rounds(self):
+        with self._patch_randbelow(repeat(EXISTING_CODE)), self.assertRaises(ValidationError):
+            self.env['loyalty.card']._generate_ewallet_codes(1)
+
+    def test_issue_cards_in_batches(self):
+        LoyaltyCard = self.env.registry['loyalty.card']
+        with patch.object(LoyaltyCard, 'create', autospec=True, side_effect=LoyaltyCard.create) as create:
+            cards = self.env['loyalty.card']._ewallet_issue_cards(25, 'visitor', batch_size=10)
+        self.assertEqual([len(call.args[1]) for call in create.call_args_list], [10, 10, 5])
+        self.assertEqual(len(cards), 25)
+        self.assertEqual(len(set(cards.mapped('code'))), 25)
+        self.assertEqual(cards.program_id, self.program)
+        self.assertEqual(set(cards.mapped('wallet_type')), {'visitor'})
+        self.assertFalse(cards.partner_id)
@@ -0,0 +1,62 @@
+from unittest import skipUnless
+
+from werkzeug.security import generate_password_hash
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.pos_ewallet.models.ewallet_credential import (
+    DEFAULT_HASH_METHOD,
+    SCRYPT_SUPPORTED,
+    _normalize_hash_method,
+)
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletCredential(TransactionCase):
+
+    def _set_hash_method(self, method):
+        self.env['ir.config_parameter'].sudo().set_param('pos_ewallet.hash_method', method)
+
+    def test_default_matches_installed_werkzeug(self):
+        self.assertEqual(generate_password_hash('1234').split('$', 1)[0], DEFAULT_HASH_METHOD)
+
+    def test_normalize_rejects_unsupported_methods(self):
+        for method in ('pbkdf', 'sha256', 'pbkdf2:nope', 'pbkdf2:sha256:abc', 'scrypt:1000:8:1', ''):
+            with self.assertRaises(ValueError, msg=method):
+                _normalize_hash_method(method)
+        if not SCRYPT_SUPPORTED:
+            with self.assertRaises(ValueError):
+                _normalize_hash_method('scrypt:32768:8:1')
+
+    def test_invalid_hash_method_falls_back_to_default(self):
+        Credential = self.env['ewallet.credential']
+        self._set_hash_method('pbkdf')
+        with self.assertLogs('odoo.addons.pos_ewallet.models.ewallet_credential', 'WARNING'):
+            secret_hash = Credential._hash_secret('1234')
+        self.assertTrue(secret_hash.startswith(DEFAULT_HASH_METHOD + '$'))
+        with self.assertLogs('odoo.addons.pos_ewallet.models.ewallet_credential', 'WARNING'):
+            self.assertEqual(Credential._check_secret(secret_hash, '1234'), (True, False))
+
+    def test_rehash_on_method_change(self):
+        Credential = self.env['ewallet.credential']
+        self._set_hash_method('pbkdf2:sha256:1000')
+        secret_hash = Credential._hash_secret('1234')
+        self._set_hash_method('pbkdf2:sha256:2000')
+        valid, new_hash = Credential._check_secret(secret_hash, '1234')
+        self.assertTrue(valid)
+        self.assertTrue(new_hash.startswith('pbkdf2:sha256:2000$'))
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletCredentialBenchmark(TransactionCase):
+
+    @skipUnless(SCRYPT_SUPPORTED, "werkzeug sin soporte de scrypt")
+    def test_benchmark_measures_memory(self):
+        # Mide en procesos hijo (fork) del servidor de pruebas
+        report = self.env['ewallet.credential']._benchmark_hash_methods(
+            ['scrypt:16384:8:1', 'pbkdf2:sha256:1000'], rounds=1,
+        )
+        scrypt, pbkdf2 = report
+        # scrypt reserva 128 · n · r bytes (16 MB); pbkdf2 casi nada
+        self.assertGreater(scrypt['memory_kb'], 12 * 1024)
+        self.assertLess(pbkdf2['memory_kb'], scrypt['memory_kb'])
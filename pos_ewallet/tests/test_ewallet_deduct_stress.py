@@ -0,0 +1,113 @@
+import logging
+import os
+import random
+import threading
+import time
+
+from psycopg2.errors import SerializationFailure
+
+from odoo import SUPERUSER_ID, api
+from odoo.service.model import MAX_TRIES_ON_CONCURRENCY_FAILURE
+from odoo.sql_db import db_connect
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+STRESS_THREADS = int(os.environ.get('EWALLET_STRESS_THREADS', 8))
+STRESS_CHARGES = int(os.environ.get('EWALLET_STRESS_CHARGES', 25))
+STRESS_AMOUNT = 3.0
+# Saldo para cubrir solo parte de los cobros: también se prueba el rechazo por saldo
+STRESS_INITIAL_POINTS = STRESS_AMOUNT * STRESS_THREADS * STRESS_CHARGES * 0.75
+# Escala de la espera aleatoria de Odoo entre reintentos (uniform(0, 2 ** intento) segundos)
+STRESS_BACKOFF_SCALE = float(os.environ.get('EWALLET_STRESS_BACKOFF_SCALE', 0.1))
+# Fracción máxima de cobros que pueden agotar los reintentos de Odoo
+STRESS_MAX_EXHAUSTED_RATIO = float(os.environ.get('EWALLET_STRESS_MAX_EXHAUSTED_RATIO', 0.05))
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletDeductStress(TransactionCase):
+    """Cobros concurrentes sobre un mismo monedero desde conexiones independientes.
+
+    Los datos se confirman en cursores propios (fuera de la transacción de la prueba)
+    para que todos los hilos vean el mismo monedero, y se eliminan al terminar.
+    """
+
+    def _new_env(self, cr):
+        return api.Environment(cr, SUPERUSER_ID, {})
+
+    def setUp(self):
+        super().setUp()
+        self.dbname = self.env.cr.dbname
+        with db_connect(self.dbname).cursor() as cr:
+            env = self._new_env(cr)
+            program = env['loyalty.program'].search([('is_ewallet_program', '=', True)], limit=1)
+            self.assertTrue(program, "Se requiere el programa eWallet aprovisionado")
+            card = env['loyalty.card'].create({
+                'program_id': program.id,
+                'points': STRESS_INITIAL_POINTS,
+                'wallet_type': 'visitor',
+            })
+            cr.commit()
+            self.card_id = card.id
+        self.addCleanup(self._delete_card)
+
+    def _delete_card(self):
+        with db_connect(self.dbname).cursor() as cr:
+            self._new_env(cr)['loyalty.card'].browse(self.card_id).unlink()
+            cr.commit()
+
+    def test_concurrent_charges_keep_balance_consistent(self):
+        lock = threading.Lock()
+        stats = {'charged': 0, 'rejected': 0, 'retries': 0, 'exhausted': 0}
+
+        def worker():
+            with db_connect(self.dbname).cursor() as cr:
+                env = self._new_env(cr)
+                for __ in range(STRESS_CHARGES):
+                    # Mismo límite y espera que el reintento de peticiones de Odoo
+                    for tries in range(MAX_TRIES_ON_CONCURRENCY_FAILURE):
+                        try:
+                            remaining = env['loyalty.card'].browse(self.card_id)._ewallet_deduct_points(STRESS_AMOUNT)
+                            cr.commit()
+                            break
+                        except SerializationFailure:
+                            cr.rollback()
+                            env.invalidate_all()
+                            with lock:
+                                stats['retries'] += 1
+                            time.sleep(random.uniform(0.0, 2 ** tries) * STRESS_BACKOFF_SCALE)
+                    else:
+                        # La petición habría fallado en Odoo con un error de concurrencia
+                        with lock:
+                            stats['exhausted'] += 1
+                        continue
+                    with lock:
+                        stats['charged' if remaining is not None else 'rejected'] += 1
+
+        threads = [threading.Thread(target=worker) for __ in range(STRESS_THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        with db_connect(self.dbname).cursor() as cr:
+            final_points = self._new_env(cr)['loyalty.card'].browse(self.card_id).points
+
+        total = STRESS_THREADS * STRESS_CHARGES
+        self.assertEqual(stats['charged'] + stats['rejected'] + stats['exhausted'], total)
+        self.assertAlmostEqual(final_points, STRESS_INITIAL_POINTS - stats['charged'] * STRESS_AMOUNT)
+        self.assertGreaterEqual(final_points, 0)
+        self.assertGreater(stats['rejected'], 0)
+        _logger.info(
+            "deducción concurrente: %s cobros, %s rechazados por saldo, %s reintentos, "
+            "%s agotaron los %s intentos de Odoo, %.1f cobros/s",
+            stats['charged'], stats['rejected'], stats['retries'],
+            stats['exhausted'], MAX_TRIES_ON_CONCURRENCY_FAILURE,
+            (stats['charged'] + stats['rejected']) / elapsed,
+        )
+        self.assertLessEqual(
+            stats['exhausted'] / total, STRESS_MAX_EXHAUSTED_RATIO,
+            f"{stats['exhausted']} de {total} cobros fallarían por concurrencia en un monedero muy usado",
+        )
@@ -0,0 +1,62 @@
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from odoo.tests import tagged
+
+from odoo.addons.point_of_sale.tests.common import TestPointOfSaleCommon
+
+_logger = logging.getLogger(__name__)
+
+BENCH_POS_CARDS = int(os.environ.get('EWALLET_BENCH_POS_CARDS', 5000))
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletLazyCardsBenchmark(TestPointOfSaleCommon):
+    """Carga inicial del POS con los monederos precargados frente a la carga diferida."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        program = cls.env['ewallet.provisioning']._provision()
+        partners = cls.env['res.partner'].create([
+            {'name': f'Cliente eWallet {i}'} for i in range(BENCH_POS_CARDS)
+        ])
+        codes = cls.env['loyalty.card']._generate_ewallet_codes(BENCH_POS_CARDS)
+        cls.env['loyalty.card'].sudo().create([{
+            'program_id': program.id,
+            'partner_id': partner.id,
+            'code': code,
+            'wallet_type': 'owner',
+            'wallet_active': True,
+            'points': 100,
+        } for partner, code in zip(partners, codes)])
+        cls.pos_config.open_ui()
+        cls.session = cls.pos_config.current_session_id
+
+    def _load(self, lazy):
+        self.pos_config.ewallet_lazy_cards = lazy
+        self.env.invalidate_all()
+        tracemalloc.start()
+        start = time.perf_counter()
+        data = self.session.load_data([])
+        elapsed = time.perf_counter() - start
+        __, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        payload = json.dumps(data, default=str)
+        cards = data['loyalty.card']
+        cards = len(cards['data'] if isinstance(cards, dict) else cards)
+        _logger.info(
+            "carga del POS (%s): %.3f s, pico de memoria %.1f MB, %.1f MB de datos, %s monederos",
+            'diferida' if lazy else 'precargada', elapsed, peak / 2 ** 20, len(payload) / 2 ** 20, cards,
+        )
+        return len(payload), cards
+
+    def test_lazy_cards_shrink_startup(self):
+        eager_size, eager_cards = self._load(lazy=False)
+        lazy_size, lazy_cards = self._load(lazy=True)
+        self.assertGreaterEqual(eager_cards, BENCH_POS_CARDS)
+        self.assertLess(lazy_cards, eager_cards)
+        self.assertLess(lazy_size, eager_size)
@@ -0,0 +1,115 @@
+import logging
+import os
+import statistics
+import time
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests import HttpCase, TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+BENCH_PAYMENTS = int(os.environ.get('EWALLET_BENCH_PAYMENTS', 50))
+PIN = '4321'
+
+
+class EwalletPayCommon:
+
+    @classmethod
+    def _setup_ewallet_card(cls, points=1_000_000.0):
+        # Hash barato: se mide el viaje de ida y vuelta, no el coste del hash
+        cls.env['ir.config_parameter'].sudo().set_param('pos_ewallet.hash_method', 'pbkdf2:sha256:1000')
+        cls.program = cls.env['ewallet.provisioning']._provision()
+        cls.program.require_pin = True
+        partner = cls.env['res.partner'].create({'name': 'Cliente eWallet'})
+        cls.card = cls.env['loyalty.card'].sudo().create({
+            'program_id': cls.program.id,
+            'partner_id': partner.id,
+            'code': cls.env['loyalty.card']._generate_ewallet_code(),
+            'wallet_type': 'owner',
+            'wallet_active': True,
+            'points': points,
+        })
+        cls.card.set_wallet_pin(PIN)
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletPay(EwalletPayCommon, TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._setup_ewallet_card(points=100.0)
+
+    def test_pay_unknown_card(self):
+        missing_id = self.card.id + 1_000_000
+        result = self.env['pos.order'].ewallet_pay(missing_id, 10.0, 'Consumo', pin=PIN)
+        self.assertFalse(result['success'])
+        self.assertTrue(result['error'])
+
+    def test_pay_wrong_pin(self):
+        result = self.env['pos.order'].ewallet_pay(self.card.id, 10.0, 'Consumo', pin='0000')
+        self.assertFalse(result['success'])
+        self.assertEqual(self.card.points, 100.0)
+
+    def test_rolled_back_charge_is_not_published(self):
+        PosConfig = self.env.registry['pos.config']
+        with patch.object(PosConfig, '_notify', autospec=True) as notify:
+            with self.assertRaises(UserError), self.env.cr.savepoint():
+                self.card._ewallet_deduct_points(30.0)
+                raise UserError("cobro revertido")
+            notify.assert_not_called()
+        # La publicación queda para después del commit y relee el saldo confirmado
+        self.assertIn(self.card.id, self.env.cr.postcommit.data['pos_ewallet.notify_card_ids'])
+        self.assertEqual(self.card.points, 100.0)
+
+    def test_pay_is_idempotent(self):
+        PosOrder = self.env['pos.order']
+        first = PosOrder.ewallet_pay(self.card.id, 10.0, 'Consumo', pin=PIN, idempotency_key='k1')
+        second = PosOrder.ewallet_pay(self.card.id, 10.0, 'Consumo', pin=PIN, idempotency_key='k1')
+        self.assertTrue(first['success'])
+        self.assertTrue(second['duplicate'])
+        self.assertEqual(self.card.points, 100.0 - first['amount_charged'])
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletPayLatencyBenchmark(EwalletPayCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls._setup_ewallet_card()
+
+    def _call(self, method, *args, **kwargs):
+        return self.make_jsonrpc_request('/web/dataset/call_kw', {
+            'model': 'pos.order',
+            'method': method,
+            'args': list(args),
+            'kwargs': kwargs,
+        })
+
+    def _pay_two_calls(self):
+        if self._call('ewallet_validate_pin', self.card.id, PIN)['valid']:
+            self._call('ewallet_process_payment', self.card.id, 1.0, 'Consumo', self.program.owner_discount)
+
+    def _pay_single_call(self):
+        self._call('ewallet_pay', self.card.id, 1.0, 'Consumo', pin=PIN)
+
+    def _median_latency(self, flow):
+        samples = []
+        for _i in range(BENCH_PAYMENTS):
+            start = time.perf_counter()
+            flow()
+            samples.append(time.perf_counter() - start)
+        return statistics.median(samples)
+
+    def test_single_call_latency(self):
+        self.authenticate('admin', 'admin')
+        self._pay_single_call()  # calentamiento
+        two_calls = self._median_latency(self._pay_two_calls)
+        single_call = self._median_latency(self._pay_single_call)
+        _logger.info(
+            "cobro eWallet (mediana de %s): validar + cobrar %.2f ms, ewallet_pay %.2f ms",
+            BENCH_PAYMENTS, two_calls * 1000, single_call * 1000,
+        )
+        self.assertLess(single_call, two_calls)
@@ -0,0 +1,68 @@
+import logging
+import time
+
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+# Límite de consultas de una ejecución sobre una base ya aprovisionada
+PROVISION_NOOP_MAX_QUERIES = 30
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletProvisioning(TransactionCase):
+
+    def _snapshot(self):
+        return {
+            model: self.env[model].search_count([])
+            for model in (
+                'product.attribute', 'product.attribute.value', 'product.template',
+                'product.template.attribute.line', 'loyalty.program', 'loyalty.rule', 'loyalty.reward',
+            )
+        }
+
+    def test_provision_is_idempotent(self):
+        Provisioning = self.env['ewallet.provisioning']
+        program = Provisioning._provision()
+        before = self._snapshot()
+        self.assertEqual(Provisioning._provision(), program)
+        self.assertEqual(self._snapshot(), before)
+        self.assertTrue(program.is_ewallet_program)
+        self.assertEqual(len(program.rule_ids[:1].product_ids), 1, "La recarga es un único producto")
+
+    def test_provision_restores_missing_records(self):
+        Provisioning = self.env['ewallet.provisioning']
+        program = Provisioning._provision()
+        program.reward_ids.unlink()
+        ewallet_tmpl = self.env['product.template'].search([('is_ewallet_product', '=', True)], limit=1)
+        ewallet_tmpl.attribute_line_ids.unlink()
+
+        Provisioning._provision()
+        self.assertTrue(program.reward_ids)
+        self.assertEqual(
+            set(ewallet_tmpl.attribute_line_ids.value_ids.mapped('name')), {'Propietario', 'Visitante'},
+        )
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletProvisioningBenchmark(TransactionCase):
+
+    def _measure(self, label):
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        self.env['ewallet.provisioning']._provision()
+        self.env.flush_all()
+        elapsed = time.perf_counter() - start
+        queries = self.env.cr.sql_log_count - queries
+        _logger.info("aprovisionamiento eWallet (%s): %.3f s, %s consultas", label, elapsed, queries)
+        return queries
+
+    def test_provision_cost(self):
+        self._measure('base aprovisionada')
+        # Reinstalación parcial: se recrean recompensa y variantes de tipo
+        program = self.env['loyalty.program'].search([('is_ewallet_program', '=', True)], limit=1)
+        program.reward_ids.unlink()
+        self.env['product.template'].search([('is_ewallet_product', '=', True)]).attribute_line_ids.unlink()
+        self._measure('reinstalación parcial')
+        self.assertLessEqual(self._measure('sin cambios'), PROVISION_NOOP_MAX_QUERIES)
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta
+
+from freezegun import freeze_time
+
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.pos_ewallet.models.ewallet_session import SESSION_RENEW_RATIO
+
+TIMEOUT_MINUTES = 5
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletSession(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente eWallet'})
+
+    def test_renewal_waits_for_ratio(self):
+        Session = self.env['ewallet.session']
+        start = datetime(2026, 1, 1, 12, 0, 0)
+        threshold = timedelta(minutes=TIMEOUT_MINUTES) * SESSION_RENEW_RATIO
+        with freeze_time(start):
+            session = Session.create_session(self.partner.id, TIMEOUT_MINUTES)
+        expires_at = session.expires_at
+
+        # Antes del umbral la sesión es válida pero no se escribe
+        with freeze_time(start + threshold - timedelta(seconds=1)):
+            self.assertEqual(Session.validate_session(session.token, TIMEOUT_MINUTES), self.partner)
+        self.assertEqual(session.expires_at, expires_at)
+
+        # Al alcanzar el umbral se renueva el timeout completo desde ahora
+        renew_at = start + threshold
+        with freeze_time(renew_at):
+            self.assertEqual(Session.validate_session(session.token, TIMEOUT_MINUTES), self.partner)
+        self.assertEqual(session.expires_at, renew_at + timedelta(minutes=TIMEOUT_MINUTES))
+
+    def test_expired_session_is_rejected(self):
+        Session = self.env['ewallet.session']
+        start = datetime(2026, 1, 1, 12, 0, 0)
+        with freeze_time(start):
+            session = Session.create_session(self.partner.id, TIMEOUT_MINUTES)
+        with freeze_time(start + timedelta(minutes=TIMEOUT_MINUTES, seconds=1)):
+            self.assertFalse(Session.validate_session(session.token, TIMEOUT_MINUTES))
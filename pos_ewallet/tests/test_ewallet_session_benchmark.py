@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import os
+import random
+import time
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import SQL
+
+_logger = logging.getLogger(__name__)
+
+BENCH_SESSIONS = int(os.environ.get('EWALLET_BENCH_SESSIONS', 1_000_000))
+BENCH_SMALL_SESSIONS = int(os.environ.get('EWALLET_BENCH_SMALL_SESSIONS', 10_000))
+BENCH_LOOKUPS = int(os.environ.get('EWALLET_BENCH_LOOKUPS', 1000))
+# Cociente máximo entre la latencia por búsqueda con BENCH_SESSIONS y con BENCH_SMALL_SESSIONS
+BENCH_MAX_LOOKUP_RATIO = float(os.environ.get('EWALLET_BENCH_MAX_LOOKUP_RATIO', 2.0))
+BENCH_PORTAL_SESSIONS = int(os.environ.get('EWALLET_BENCH_PORTAL_SESSIONS', 200))
+BENCH_PORTAL_HITS = int(os.environ.get('EWALLET_BENCH_PORTAL_HITS', 20))
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletSessionBenchmark(TransactionCase):
+    """Búsqueda de sesiones por token y purga sobre tablas de 10 mil y un millón de sesiones.
+
+    Ejecución: odoo-bin -d <db> --test-tags pos_ewallet_benchmark --stop-after-init
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'eWallet Bench'})
+        cls._insert_sessions(cls.env.cr, cls.partner.id, 1, BENCH_SMALL_SESSIONS)
+
+    @staticmethod
+    def _insert_sessions(cr, partner_id, first, last):
+        # ~1% vencidas y ~1% inactivas, como entre dos ejecuciones del cron de purga
+        cr.execute(SQL(
+            """
+            INSERT INTO ewallet_session
+                   (partner_id, token, expires_at, is_active,
+                    create_uid, write_uid, create_date, write_date)
+            SELECT %(partner)s, md5(i::text),
+                   (now() AT TIME ZONE 'UTC') + ((i %% 1000) - 10) * interval '1 minute',
+                   i %% 100 <> 0,
+                   1, 1,
+                   (now() AT TIME ZONE 'UTC') - interval '1 hour',
+                   (now() AT TIME ZONE 'UTC') - (i %% 3) * interval '1 day'
+              FROM generate_series(%(first)s, %(last)s) AS i
+            """,
+            partner=partner_id, first=first, last=last,
+        ))
+        cr.execute("ANALYZE ewallet_session")
+
+    def _fill_to_full_size(self):
+        self._insert_sessions(self.env.cr, self.partner.id, BENCH_SMALL_SESSIONS + 1, BENCH_SESSIONS)
+
+    def _explain(self, query):
+        self.env.cr.execute(SQL("EXPLAIN %s", query))
+        return '\n'.join(row[0] for row in self.env.cr.fetchall())
+
+    def _lookup_ms(self, table_size):
+        """Latencia media (ms) de validate_session sobre tokens al azar de la tabla."""
+        Session = self.env['ewallet.session']
+        rng = random.Random(42)
+        tokens = [
+            hashlib.md5(str(rng.randint(1, table_size)).encode()).hexdigest()
+            for __ in range(BENCH_LOOKUPS)
+        ]
+        for token in tokens[:100]:  # calentamiento
+            Session.validate_session(token)
+        start = time.perf_counter()
+        for token in tokens:
+            Session.validate_session(token)
+        self.env.flush_all()
+        return (time.perf_counter() - start) * 1000 / BENCH_LOOKUPS
+
+    def test_token_lookup(self):
+        Session = self.env['ewallet.session']
+        small_ms = self._lookup_ms(BENCH_SMALL_SESSIONS)
+        self._fill_to_full_size()
+
+        query = Session._search([('token', '=', 'abc'), ('is_active', '=', True)], limit=1)
+        plan = self._explain(query.select())
+        self.assertIn('Index', plan, plan)
+        self.assertNotIn('Seq Scan', plan, plan)
+
+        large_ms = self._lookup_ms(BENCH_SESSIONS)
+        _logger.info(
+            "ewallet.session: búsqueda por token %.3f ms con %s sesiones, %.3f ms con %s (x%.2f)",
+            small_ms, BENCH_SMALL_SESSIONS, large_ms, BENCH_SESSIONS, large_ms / small_ms,
+        )
+        self.assertLessEqual(
+            large_ms / small_ms, BENCH_MAX_LOOKUP_RATIO,
+            "La latencia por búsqueda debe mantenerse plana al crecer la tabla",
+        )
+
+    def test_purge_uses_indexes(self):
+        self._fill_to_full_size()
+        Session = self.env['ewallet.session']
+        cutoff = Session.env.cr.now()
+        query = Session._search([
+            '|',
+            ('expires_at', '<', cutoff),
+            '&', ('is_active', '=', False), ('write_date', '<', cutoff),
+        ], order='id', limit=1000)
+        plan = self._explain(query.select())
+        self.assertNotIn('Seq Scan', plan, plan)
+
+        start = time.perf_counter()
+        Session.cleanup_expired_sessions()
+        elapsed = time.perf_counter() - start
+        _logger.info("ewallet.session: purga sobre %s sesiones en %.2f s", BENCH_SESSIONS, elapsed)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'pos_ewallet_benchmark')
+class TestEwalletSessionRenewalBenchmark(TransactionCase):
+    """Peticiones de portal por segundo: renovación en cada petición contra renovación por umbral."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        partners = cls.env['res.partner'].create([
+            {'name': f'eWallet Bench {i}'} for i in range(BENCH_PORTAL_SESSIONS)
+        ])
+        Session = cls.env['ewallet.session']
+        cls.tokens = [Session.create_session(partner.id).token for partner in partners]
+        cls.env.flush_all()
+
+    def _hits_per_second(self):
+        Session = self.env['ewallet.session']
+        start = time.perf_counter()
+        for _hit in range(BENCH_PORTAL_HITS):
+            for token in self.tokens:
+                self.assertTrue(Session.validate_session(token))
+                # Cada petición del portal termina en su propia transacción
+                self.env.flush_all()
+        elapsed = time.perf_counter() - start
+        return BENCH_PORTAL_HITS * len(self.tokens) / elapsed
+
+    def test_portal_hits_per_second(self):
+        # Ruta anterior: umbral 0, cada validación escribe expires_at
+        with patch('odoo.addons.pos_ewallet.models.ewallet_session.SESSION_RENEW_RATIO', 0):
+            always_write = self._hits_per_second()
+        ratio_renewal = self._hits_per_second()
+        _logger.info(
+            "portal eWallet: %.0f peticiones/s escribiendo siempre, %.0f peticiones/s con renovación por umbral",
+            always_write, ratio_renewal,
+        )
+        self.assertGreater(ratio_renewal, always_write)
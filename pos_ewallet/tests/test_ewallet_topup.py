@@ -0,0 +1,88 @@
+from odoo.exceptions import UserError
+from odoo.fields import Command
+from odoo.tests import TransactionCase, tagged
+
+from odoo.addons.point_of_sale.tests.common import TestPointOfSaleCommon
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletTopupLimits(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls.env['ewallet.provisioning']._provision()
+        cls.program.write({'topup_min_amount': 10.0, 'topup_max_amount': 500.0, 'topup_step': 10.0})
+
+    def test_topup_within_limits(self):
+        for amount in (10.0, 120.0, 500.0):
+            self.assertIsNone(self.program._ewallet_get_topup_error(amount))
+
+    def test_topup_outside_limits(self):
+        for amount in (0.0, 5.0, 510.0, 125.0):
+            self.assertTrue(self.program._ewallet_get_topup_error(amount), amount)
+
+    def test_topup_any_amount_without_step(self):
+        self.program.topup_step = 0.0
+        self.assertIsNone(self.program._ewallet_get_topup_error(123.45))
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletTopupOrder(TestPointOfSaleCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.program = cls.env['ewallet.provisioning']._provision()
+        cls.program.write({'topup_min_amount': 10.0, 'topup_max_amount': 500.0, 'topup_step': 10.0})
+        cls.topup_product = cls.program.rule_ids.product_ids[:1]
+        cls.topup_product.taxes_id = False
+        cls.pos_config.open_ui()
+        cls.session = cls.pos_config.current_session_id
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente eWallet'})
+        cls.card = cls.env['loyalty.card'].sudo().create({
+            'program_id': cls.program.id,
+            'partner_id': cls.partner.id,
+            'code': cls.env['loyalty.card']._generate_ewallet_code(),
+            'wallet_type': 'owner',
+            'wallet_active': True,
+            'points': 0,
+        })
+
+    def _topup_order(self, amount):
+        return self.env['pos.order'].create({
+            'session_id': self.session.id,
+            'partner_id': self.partner.id,
+            'lines': [Command.create({
+                'product_id': self.topup_product.id,
+                'qty': 1,
+                'price_unit': amount,
+                'price_subtotal': amount,
+                'price_subtotal_incl': amount,
+            })],
+            'amount_tax': 0.0,
+            'amount_total': amount,
+            'amount_paid': amount,
+            'amount_return': 0.0,
+        })
+
+    def _coupon_data(self, points):
+        return {str(self.card.id): {
+            'points': points,
+            'program_id': self.program.id,
+            'coupon_id': self.card.id,
+            'barcode': self.card.code,
+        }}
+
+    def test_confirm_refuses_out_of_limits_topup(self):
+        order = self._topup_order(1000.0)
+        with self.assertRaises(UserError):
+            order.confirm_coupon_programs(self._coupon_data(1000.0))
+        self.assertEqual(self.card.points, 0)
+
+    def test_confirm_refuses_inflated_points(self):
+        order = self._topup_order(100.0)
+        self.assertIsNone(order._ewallet_get_coupon_points_error(self._coupon_data(100.0)))
+        with self.assertRaises(UserError):
+            order.confirm_coupon_programs(self._coupon_data(100000.0))
+        self.assertEqual(self.card.points, 0)
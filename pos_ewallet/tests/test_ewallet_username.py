@@ -0,0 +1,48 @@
+from psycopg2 import IntegrityError
+
+from odoo.tests import TransactionCase, tagged
+from odoo.tools import mute_logger
+
+
+@tagged('post_install', '-at_install')
+class TestEwalletUsername(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner = cls.env['res.partner'].create({
+            'name': 'Cliente eWallet',
+            'ewallet_username': '  Juan.Perez ',
+        })
+
+    def test_username_is_normalized(self):
+        self.assertEqual(self.partner.ewallet_username, 'juan.perez')
+        self.partner.write({'ewallet_username': 'JPEREZ'})
+        self.assertEqual(self.partner.ewallet_username, 'jperez')
+        self.partner.write({'ewallet_username': '   '})
+        self.assertFalse(self.partner.ewallet_username)
+
+    def test_find_ignores_case_and_spaces(self):
+        Partner = self.env['res.partner']
+        self.assertEqual(Partner._find_ewallet_partner(' JUAN.PEREZ'), self.partner)
+        self.assertFalse(Partner._find_ewallet_partner('otro.usuario'))
+        self.assertFalse(Partner._find_ewallet_partner(''))
+
+    def test_find_skips_archived_partners(self):
+        self.partner.active = False
+        self.assertFalse(self.env['res.partner']._find_ewallet_partner('juan.perez'))
+
+    def test_find_sees_renames_immediately(self):
+        Partner = self.env['res.partner']
+        self.assertTrue(Partner._find_ewallet_partner('juan.perez'))
+        self.partner.ewallet_username = 'juan.p'
+        self.assertFalse(Partner._find_ewallet_partner('juan.perez'))
+        self.assertEqual(Partner._find_ewallet_partner('juan.p'), self.partner)
+
+    def test_username_unique_ignoring_case(self):
+        # El índice único es sobre lower(): aunque se salte la normalización, choca igual
+        with mute_logger('odoo.sql_db'), self.assertRaises(IntegrityError), self.env.cr.savepoint():
+            other = self.env['res.partner'].create({'name': 'Otro cliente'})
+            self.env.cr.execute(
+                "UPDATE res_partner SET ewallet_username = 'JUAN.PEREZ' WHERE id = %s", [other.id],
+            )
@@ -0,0 +1,46 @@
+import time
+
+from odoo import _, fields, models
+from odoo.exceptions import ValidationError
+
+class EwalletCardIssueWizard(models.TransientModel):
+    _name = 'ewallet.card.issue.wizard'
+    _description = 'Emisión masiva de monederos eWallet'
+
+    card_count = fields.Integer(
+        string="Cantidad",
+        required=True,
+        default=100,
+    )
+    wallet_type = fields.Selection(
+        selection=[
+            ('owner', 'Propietario'),
+            ('visitor', 'Visitante'),
+        ],
+        string="Tipo de Monedero",
+        required=True,
+        default='visitor',
+    )
+
+    def action_issue_cards(self):
+        """Emite los monederos y notifica la cantidad creada y el rendimiento."""
+        self.ensure_one()
+        if self.card_count <= 0:
+            raise ValidationError(_("La cantidad de monederos debe ser mayor que cero."))
+
+        start = time.perf_counter()
+        cards = self.env['loyalty.card']._ewallet_issue_cards(self.card_count, self.wallet_type)
+        elapsed = time.perf_counter() - start
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Monederos emitidos"),
+                'message': _("%(count)s monederos creados en %(elapsed).2f s (%(rate).0f/s).",
+                             count=len(cards), elapsed=elapsed,
+                             rate=len(cards) / elapsed if elapsed else len(cards)),
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }
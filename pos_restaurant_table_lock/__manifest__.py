@@ -27,6 +27,10 @@
         'point_of_sale._assets_pos': [
             'pos_restaurant_table_lock/static/src/**/*',
         ],
+        'web.assets_unit_tests': [
+            'pos_restaurant_table_lock/static/src/app/services/table_order_index.js',
+            'pos_restaurant_table_lock/static/tests/unit/**/*',
+        ],
     },
     'installable': True,
     'auto_install': False,
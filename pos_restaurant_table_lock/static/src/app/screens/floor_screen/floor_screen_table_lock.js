@@ -87,13 +87,10 @@ patch(FloorScreen.prototype, {
         );
     },
 
-    // Busca la orden draft activa vinculada a la mesa (null = mesa libre)
+    // Busca la orden draft activa vinculada a la mesa (null = mesa libre);
+    // el índice lo mantiene PosStore con los eventos de pos.order
     _getActiveDraftOrderForTable(table) {
-        return (
-            this.pos.models["pos.order"]?.find(
-                (o) => o.table_id?.id === table.id && !o.finalized && o.state === "draft"
-            ) ?? null
-        );
+        return this.pos._getActiveDraftOrderForTable(table);
     },
 
     // Retorna el hr.employee cajero de la orden, o null si no aplica.
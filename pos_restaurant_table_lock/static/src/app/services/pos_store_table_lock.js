@@ -4,9 +4,15 @@ import { _t } from "@web/core/l10n/translation";
 import { makeAwaitable } from "@point_of_sale/app/utils/make_awaitable_dialog";
 import { TableLockPinDialog } from "@pos_restaurant_table_lock/app/components/table_lock_pin_dialog/table_lock_pin_dialog";
 import { TableNameDialog } from "@pos_restaurant_table_lock/app/components/table_name_dialog/table_name_dialog";
+import { TableOrderIndex } from "@pos_restaurant_table_lock/app/services/table_order_index";
 
 patch(PosStore.prototype, {
 
+    async setup() {
+        await super.setup(...arguments);
+        this._watchTableOrders();
+    },
+
     // ─── Condición maestra del módulo ──────────────────────────────────────────
     get isTableLockEnabled() {
         return Boolean(
@@ -195,12 +201,35 @@ patch(PosStore.prototype, {
     },
 
     // ─── Helpers ─────────────────────────────────────────────────────────────
+    // Índice mesa → orden draft activa: se construye en la primera consulta y luego
+    // se mantiene con los eventos de pos.order (crear, cerrar, transferir, eliminar)
+    _watchTableOrders() {
+        const Order = this.models["pos.order"];
+        Order.addEventListener("create", ({ ids }) => {
+            for (const id of ids || []) {
+                this._tableOrderIndex?.addOrder(Order.get(id));
+            }
+        });
+        Order.addEventListener("update", ({ id }) => this._tableOrderIndex?.addOrder(Order.get(id)));
+        Order.addEventListener("delete", ({ id }) => this._tableOrderIndex?.removeOrder(id));
+    },
+
+    _getTableOrderIndex() {
+        if (!this._tableOrderIndex) {
+            this._tableOrderIndex = TableOrderIndex.fromOrders(this.models["pos.order"].getAll());
+        }
+        return this._tableOrderIndex;
+    },
+
+    // Busca la orden draft activa de la mesa (null = mesa libre)
     _getActiveDraftOrderForTable(table) {
-        return (
-            this.models["pos.order"]?.find(
-                (o) => o.table_id?.id === table.id && !o.finalized && o.state === "draft"
-            ) ?? null
-        );
+        let order = this._getTableOrderIndex().get(table.id);
+        if (order === null) {
+            // La orden cambió sin emitir evento: se reconstruye el índice
+            this._tableOrderIndex = null;
+            order = this._getTableOrderIndex().get(table.id);
+        }
+        return order ?? null;
     },
 
     async _promptTableName(order, defaultName) {
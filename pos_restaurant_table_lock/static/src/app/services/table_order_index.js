@@ -0,0 +1,69 @@
+// ─── Índice mesa → orden draft activa ────────────────────────────────────────
+// Se construye una vez y se mantiene orden a orden con los eventos del modelo
+// pos.order (crear, actualizar, eliminar): una orden creada, cerrada o transferida
+// solo reubica su propia entrada. Si una orden cambió sin emitir evento, la
+// consulta detecta la entrada obsoleta y reconstruye el índice.
+
+export function isActiveTableOrder(order) {
+    return Boolean(order?.table_id && !order.finalized && order.state === "draft");
+}
+
+export class TableOrderIndex {
+    constructor() {
+        // id de mesa → (id de orden → orden), en orden de inserción
+        this._ordersByTable = new Map();
+        // id de orden → id de mesa donde quedó indexada, para poder retirarla
+        this._tableByOrder = new Map();
+    }
+
+    static fromOrders(orders) {
+        const index = new TableOrderIndex();
+        for (const order of orders) {
+            index.addOrder(order);
+        }
+        return index;
+    }
+
+    addOrder(order) {
+        if (!order) {
+            return;
+        }
+        this.removeOrder(order.id);
+        if (!isActiveTableOrder(order)) {
+            return;
+        }
+        const tableId = order.table_id.id;
+        if (!this._ordersByTable.has(tableId)) {
+            this._ordersByTable.set(tableId, new Map());
+        }
+        this._ordersByTable.get(tableId).set(order.id, order);
+        this._tableByOrder.set(order.id, tableId);
+    }
+
+    removeOrder(orderId) {
+        const tableId = this._tableByOrder.get(orderId);
+        if (tableId === undefined) {
+            return;
+        }
+        const orders = this._ordersByTable.get(tableId);
+        orders.delete(orderId);
+        if (!orders.size) {
+            this._ordersByTable.delete(tableId);
+        }
+        this._tableByOrder.delete(orderId);
+    }
+
+    // Primera orden activa de la mesa, o undefined si está libre.
+    // Retorna null si la entrada quedó obsoleta y el índice debe reconstruirse.
+    get(tableId) {
+        const orders = this._ordersByTable.get(tableId);
+        if (!orders) {
+            return undefined;
+        }
+        const order = orders.values().next().value;
+        if (!isActiveTableOrder(order) || order.table_id.id !== tableId) {
+            return null;
+        }
+        return order;
+    }
+}
@@ -0,0 +1,111 @@
+import { describe, expect, test } from "@odoo/hoot";
+import {
+    TableOrderIndex,
+    isActiveTableOrder,
+} from "@pos_restaurant_table_lock/app/services/table_order_index";
+
+const TABLES = 100;
+const ORDERS = 5000;
+const RENDERS = 50;
+// Consultas por mesa en cada render: filtro, dueño y nombre visible
+const LOOKUPS_PER_TABLE = 3;
+
+function makeOrders() {
+    const tables = Array.from({ length: TABLES }, (_, i) => ({ id: i + 1 }));
+    // La mayoría son órdenes ya pagadas; solo la mitad de las mesas tiene una orden abierta
+    const orders = Array.from({ length: ORDERS }, (_, i) => {
+        const open = i < TABLES / 2;
+        return {
+            id: i + 1,
+            table_id: tables[i % TABLES],
+            state: open ? "draft" : "paid",
+            finalized: !open,
+        };
+    });
+    return { tables, orders };
+}
+
+function renderFloor(tables, lookup) {
+    let hits = 0;
+    for (let render = 0; render < RENDERS; render++) {
+        for (const table of tables) {
+            for (let i = 0; i < LOOKUPS_PER_TABLE; i++) {
+                if (lookup(table)) {
+                    hits++;
+                }
+            }
+        }
+    }
+    return hits;
+}
+
+describe("TableOrderIndex", () => {
+    test("reubica la orden al crearla, transferirla y cerrarla", () => {
+        const { tables, orders } = makeOrders();
+        const index = TableOrderIndex.fromOrders(orders);
+        expect(index.get(1)).toBe(orders[0]);
+        expect(index.get(TABLES)).toBe(undefined);
+
+        const order = { id: ORDERS + 1, table_id: tables[TABLES - 1], state: "draft", finalized: false };
+        index.addOrder(order);
+        expect(index.get(TABLES)).toBe(order);
+
+        order.table_id = tables[TABLES - 2];
+        index.addOrder(order);
+        expect(index.get(TABLES)).toBe(undefined);
+        expect(index.get(TABLES - 1)).toBe(order);
+
+        order.state = "paid";
+        order.finalized = true;
+        index.addOrder(order);
+        expect(index.get(TABLES - 1)).toBe(undefined);
+    });
+
+    test("detecta una orden cerrada sin evento", () => {
+        const { orders } = makeOrders();
+        const index = TableOrderIndex.fromOrders(orders);
+        orders[0].state = "paid";
+        orders[0].finalized = true;
+        expect(index.get(1)).toBe(null);
+    });
+
+    test("benchmark: render del plano", () => {
+        const { tables, orders } = makeOrders();
+        const find = (table) =>
+            orders.find((o) => isActiveTableOrder(o) && o.table_id.id === table.id);
+
+        // Referencia: búsqueda lineal por cada consulta
+        const scanStart = performance.now();
+        const scanHits = renderFloor(tables, find);
+        const scanMs = performance.now() - scanStart;
+
+        // Índice reconstruido en cada render
+        const rebuildStart = performance.now();
+        let rebuildHits = 0;
+        for (let render = 0; render < RENDERS; render++) {
+            const index = TableOrderIndex.fromOrders(orders);
+            for (const table of tables) {
+                for (let i = 0; i < LOOKUPS_PER_TABLE; i++) {
+                    if (index.get(table.id)) {
+                        rebuildHits++;
+                    }
+                }
+            }
+        }
+        const rebuildMs = performance.now() - rebuildStart;
+
+        // Índice mantenido: se construye una vez
+        const index = TableOrderIndex.fromOrders(orders);
+        const indexStart = performance.now();
+        const indexHits = renderFloor(tables, (table) => index.get(table.id));
+        const indexMs = performance.now() - indexStart;
+
+        expect(rebuildHits).toBe(scanHits);
+        expect(indexHits).toBe(scanHits);
+        console.info(
+            `TableOrderIndex: ${TABLES} mesas, ${ORDERS} órdenes × ${RENDERS} renders, ` +
+                `búsqueda lineal ${scanMs.toFixed(2)} ms, reconstrucción por render ` +
+                `${rebuildMs.toFixed(2)} ms, índice mantenido ${indexMs.toFixed(2)} ms`
+        );
+    });
+});
@@ -21,7 +21,9 @@
     ],
     'data': [
         'security/loyalty_security.xml',
+        'security/ir.model.access.csv',
         'views/loyalty_program_views.xml',
+        'wizard/loyalty_program_company_wizard_views.xml',
     ],
     'installable': True,
     'application': False,
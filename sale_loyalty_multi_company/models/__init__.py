@@ -1 +1,3 @@
-from . import loyalty_program
\ No newline at end of file
+from . import loyalty_program
+from . import res_company
+from . import pos_config
@@ -1,6 +1,25 @@
-from odoo import models, fields, api
+from odoo import models, fields, api, tools
 from odoo.models import to_record_ids
 from odoo.fields import Domain
+from odoo.tools import SQL
+
+
+def _program_company_domain(env, companies, program_path):
+    """Dominio de compañía resuelto con los programas aplicables en caché para esas empresas.
+
+    Si las empresas llegan como expresión (dominios de vistas), se usa el conjunto materializado
+    de empresas efectivas.
+    """
+    company_ids = to_record_ids(companies)
+    if isinstance(company_ids, str):
+        path = 'effective_company_ids' if program_path == 'id' else f'{program_path}.effective_company_ids'
+        return Domain.OR([
+            [('company_id', '=', False)],
+            [(path, 'in', company_ids)],
+        ])
+    program_ids = env['loyalty.program']._get_company_program_ids(tuple(sorted({cid for cid in company_ids if cid})))
+    return [(program_path, 'in', list(program_ids))]
+
 
 class LoyaltyProgram(models.Model):
     _inherit = 'loyalty.program'
@@ -20,13 +39,50 @@ class LoyaltyProgram(models.Model):
         help="Si se selecciona una empresa con sucursales, se asignarán las sucursales automáticamente y no se podrán quitar mientras la empresa principal siga asignada.",
     )
 
+    effective_company_ids = fields.Many2many(
+        string="Empresas Efectivas",
+        comodel_name='res.company',
+        relation='loyalty_program_effective_company_rel',
+        column1='program_id',
+        column2='company_id',
+        compute='_compute_effective_company_ids',
+        store=True,
+        help="Empresa principal, empresas permitidas y todas sus sucursales. Es el conjunto que usan las reglas de acceso multi empresa.",
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        programs = super().create(vals_list)
+        self.env.registry.clear_cache()
+        return programs
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'company_id' in vals or 'multi_company_ids' in vals:
+            self.env.registry.clear_cache()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self.env.registry.clear_cache()
+        return res
+
+    @api.depends('company_id', 'multi_company_ids')
+    def _compute_effective_company_ids(self):
+        for program in self:
+            roots = program.company_id | program.multi_company_ids
+            if roots:
+                program.effective_company_ids = self.env['res.company'].browse(roots._get_descendant_company_ids())
+            else:
+                program.effective_company_ids = False
+
     @api.onchange('multi_company_ids')
     def _onchange_multi_company_ids(self):
         for program in self:
             if program.multi_company_ids:
                 current_ids = program.multi_company_ids.ids
-                expanded_companies = self.env['res.company'].search([('id', 'child_of', current_ids)])
-                final_ids = [cid for cid in expanded_companies.ids if cid != program.company_id.id]
+                expanded_ids = program.multi_company_ids._get_descendant_company_ids()
+                final_ids = [cid for cid in expanded_ids if cid != program.company_id.id]
                 
                 if set(final_ids) != set(current_ids):
                     program.multi_company_ids = [(6, 0, final_ids)]
@@ -36,13 +92,13 @@ class LoyaltyProgram(models.Model):
         for program in self:
             if program.company_id:
                 current_ids = program.multi_company_ids.ids
-                companies_to_remove = self.env['res.company'].search([('id', 'child_of', program.company_id.id)]).ids
+                companies_to_remove = program.company_id._get_descendant_company_ids()
                 
                 removed_any = any(cid in companies_to_remove for cid in current_ids)
                 new_ids = [cid for cid in current_ids if cid not in companies_to_remove]
                 
-                expanded_companies = self.env['res.company'].search([('id', 'child_of', new_ids)])
-                final_ids = [cid for cid in expanded_companies.ids if cid not in companies_to_remove]
+                expanded_ids = self.env['res.company'].browse(new_ids)._get_descendant_company_ids()
+                final_ids = [cid for cid in expanded_ids if cid not in companies_to_remove]
                 
                 if set(final_ids) != set(current_ids):
                     program.multi_company_ids = [(6, 0, final_ids)]
@@ -56,14 +112,33 @@ class LoyaltyProgram(models.Model):
                         }
 
     def _check_company_domain(self, companies):
-        domain = super()._check_company_domain(companies)
         if not companies:
-            return domain
-        allowed_companies = to_record_ids(companies)
-        return Domain.OR([
-            domain,
-            [('multi_company_ids', 'in', allowed_companies)]
-        ])
+            return super()._check_company_domain(companies)
+        return _program_company_domain(self.env, companies, 'id')
+
+    @api.model
+    @tools.ormcache('company_ids')
+    def _get_company_program_ids(self, company_ids):
+        """Ids de los programas (activos o no) aplicables a alguna de las empresas dadas.
+
+        Incluye los programas sin empresa. Se invalida al cambiar programas o la jerarquía de empresas.
+        """
+        self.flush_model(['company_id', 'effective_company_ids'])
+        self.env.cr.execute(SQL(
+            """
+            SELECT p.id
+              FROM loyalty_program p
+             WHERE p.company_id IS NULL
+                OR EXISTS (
+                    SELECT 1
+                      FROM loyalty_program_effective_company_rel rel
+                     WHERE rel.program_id = p.id
+                       AND rel.company_id = ANY(%s)
+                )
+            """,
+            list(company_ids),
+        ))
+        return frozenset(row[0] for row in self.env.cr.fetchall())
 
 class LoyaltyRule(models.Model):
     _inherit = 'loyalty.rule'
@@ -73,14 +148,9 @@ class LoyaltyRule(models.Model):
     )
 
     def _check_company_domain(self, companies):
-        domain = super()._check_company_domain(companies)
         if not companies:
-            return domain
-        allowed_companies = to_record_ids(companies)
-        return Domain.OR([
-            domain,
-            [('multi_company_ids', 'in', allowed_companies)]
-        ])
+            return super()._check_company_domain(companies)
+        return _program_company_domain(self.env, companies, 'program_id')
 
 class LoyaltyReward(models.Model):
     _inherit = 'loyalty.reward'
@@ -90,14 +160,9 @@ class LoyaltyReward(models.Model):
     )
 
     def _check_company_domain(self, companies):
-        domain = super()._check_company_domain(companies)
         if not companies:
-            return domain
-        allowed_companies = to_record_ids(companies)
-        return Domain.OR([
-            domain,
-            [('multi_company_ids', 'in', allowed_companies)]
-        ])
+            return super()._check_company_domain(companies)
+        return _program_company_domain(self.env, companies, 'program_id')
 
 class LoyaltyCard(models.Model):
     _inherit = 'loyalty.card'
@@ -107,12 +172,7 @@ class LoyaltyCard(models.Model):
     )
 
     def _check_company_domain(self, companies):
-        domain = super()._check_company_domain(companies)
         if not companies:
-            return domain
-        allowed_companies = to_record_ids(companies)
-        return Domain.OR([
-            domain,
-            [('multi_company_ids', 'in', allowed_companies)]
-        ])
+            return super()._check_company_domain(companies)
+        return _program_company_domain(self.env, companies, 'program_id')
 
@@ -0,0 +1,10 @@
+from odoo import models
+
+
+class PosConfig(models.Model):
+    _inherit = 'pos.config'
+
+    def _get_program_ids(self):
+        programs = super()._get_program_ids()
+        applicable_ids = self.env['loyalty.program']._get_company_program_ids((self.company_id.id,))
+        return programs.filtered(lambda program: program.id in applicable_ids)
@@ -0,0 +1,71 @@
+from collections import defaultdict
+
+from odoo import api, models, tools
+
+
+class ResCompany(models.Model):
+    _inherit = 'res.company'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        companies = super().create(vals_list)
+        self._invalidate_company_tree()
+        if any(vals.get('parent_id') for vals in vals_list):
+            self._recompute_loyalty_effective_companies()
+        return companies
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'parent_id' in vals or 'active' in vals:
+            self._invalidate_company_tree()
+            self._recompute_loyalty_effective_companies()
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        self._invalidate_company_tree()
+        return res
+
+    # ── Árbol de empresas en caché ──
+
+    @api.model
+    @tools.ormcache()
+    def _get_company_tree(self):
+        """Árbol de empresas activas calculado desde parent_path.
+
+        Devuelve {company_id: (ancestros, descendientes)}; ambas tuplas incluyen a la propia empresa.
+        El resultado es compartido por la caché del registro: no debe modificarse.
+        """
+        self.flush_model(['parent_path', 'active'])
+        self.env.cr.execute("SELECT id, parent_path FROM res_company WHERE active")
+        ancestors = {}
+        descendants = defaultdict(list)
+        for company_id, parent_path in self.env.cr.fetchall():
+            path = tuple(int(part) for part in (parent_path or f'{company_id}/').split('/') if part)
+            ancestors[company_id] = path
+            for ancestor_id in path:
+                descendants[ancestor_id].append(company_id)
+        return {
+            company_id: (path, tuple(descendants[company_id]))
+            for company_id, path in ancestors.items()
+        }
+
+    def _get_descendant_company_ids(self):
+        """Ids de las empresas activas de self y todas sus sucursales (equivale a child_of)."""
+        tree = self._get_company_tree()
+        return {descendant_id for company_id in self.ids for descendant_id in tree.get(company_id, ((), ()))[1]}
+
+    def _get_ancestor_company_ids(self):
+        """Ids de self y todas sus empresas padre (equivale a parent_of)."""
+        tree = self._get_company_tree()
+        return {ancestor_id for company_id in self.ids for ancestor_id in tree.get(company_id, ((), ()))[0]}
+
+    def _invalidate_company_tree(self):
+        self.env.registry.clear_cache()
+
+    def _recompute_loyalty_effective_companies(self):
+        """Recalcula las empresas efectivas de los programas al cambiar la jerarquía de empresas."""
+        programs = self.env['loyalty.program'].sudo().with_context(active_test=False).search([
+            '|', ('company_id', '!=', False), ('multi_company_ids', '!=', False),
+        ])
+        self.env.add_to_compute(programs._fields['effective_company_ids'], programs)
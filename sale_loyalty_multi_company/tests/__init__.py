@@ -0,0 +1,3 @@
+from . import test_multi_company_benchmark
+from . import test_loyalty_program_company_wizard
+from . import test_multi_company_rules
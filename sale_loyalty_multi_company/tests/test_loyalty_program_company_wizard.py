@@ -0,0 +1,43 @@
+from odoo.exceptions import ValidationError
+from odoo.fields import Command
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestLoyaltyProgramCompanyWizard(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Company = cls.env['res.company']
+        cls.owner = Company.create({'name': 'Principal'})
+        cls.company_a = Company.create({'name': 'Empresa A'})
+        cls.branch_a1 = Company.create({'name': 'Sucursal A1', 'parent_id': cls.company_a.id})
+        cls.company_b = Company.create({'name': 'Empresa B'})
+        cls.program = cls.env['loyalty.program'].create({
+            'name': 'Programa multi empresa',
+            'company_id': cls.owner.id,
+            'multi_company_ids': [Command.set((cls.company_a | cls.branch_a1 | cls.company_b).ids)],
+        })
+        # Sucursal creada después de asignar las empresas al programa
+        cls.branch_a2 = cls.env['res.company'].create({'name': 'Sucursal A2', 'parent_id': cls.company_a.id})
+
+    def _run_wizard(self, mode, companies):
+        self.env['loyalty.program.company.wizard'].create({
+            'program_ids': [Command.set(self.program.ids)],
+            'company_ids': [Command.set(companies.ids)],
+            'mode': mode,
+        }).action_assign_companies()
+
+    def test_remove_reexpands_remaining_companies(self):
+        self._run_wizard('remove', self.company_b)
+        self.assertEqual(self.program.multi_company_ids, self.company_a | self.branch_a1 | self.branch_a2)
+
+    def test_remove_branch_of_remaining_company(self):
+        with self.assertRaises(ValidationError):
+            self._run_wizard('remove', self.branch_a1)
+        self.assertEqual(self.program.multi_company_ids, self.company_a | self.branch_a1 | self.company_b)
+
+    def test_remove_branch_with_its_parent(self):
+        self._run_wizard('remove', self.company_a | self.branch_a1)
+        self.assertEqual(self.program.multi_company_ids, self.company_b)
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import random
+import time
+
+from odoo.tests import TransactionCase, new_test_user, tagged
+
+_logger = logging.getLogger(__name__)
+
+# Tamaño del escenario; se puede ajustar por variables de entorno sin tocar el código.
+BENCH_COMPANIES = int(os.environ.get('LOYALTY_BENCH_COMPANIES', 30))
+BENCH_BRANCHING = int(os.environ.get('LOYALTY_BENCH_BRANCHING', 3))
+BENCH_PROGRAMS = int(os.environ.get('LOYALTY_BENCH_PROGRAMS', 200))
+BENCH_CARDS = int(os.environ.get('LOYALTY_BENCH_CARDS', 5000))
+BENCH_HISTORY_PER_CARD = int(os.environ.get('LOYALTY_BENCH_HISTORY_PER_CARD', 2))
+BENCH_REPEAT = int(os.environ.get('LOYALTY_BENCH_REPEAT', 5))
+BENCH_SEED = int(os.environ.get('LOYALTY_BENCH_SEED', 42))
+BENCH_REPORT = os.environ.get('LOYALTY_BENCH_REPORT')
+
+
+@tagged('-standard', '-at_install', 'post_install', 'loyalty_benchmark')
+class TestMultiCompanyLoyaltyBenchmark(TransactionCase):
+    """Mide el coste de las reglas multi empresa de lealtad para un usuario de sucursal.
+
+    Ejecución: odoo-bin -d <db> --test-tags loyalty_benchmark --stop-after-init
+    Con LOYALTY_BENCH_REPORT=<ruta.json> el informe se guarda para compararlo entre versiones.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.rng = random.Random(BENCH_SEED)
+        cls.results = []
+        cls._create_company_tree()
+        cls._create_programs()
+        cls._create_cards()
+
+        cls.branch_company = cls.companies[-1]
+        cls.branch_user = new_test_user(
+            cls.env,
+            login='loyalty_bench_branch_user',
+            groups='base.group_user,sales_team.group_sale_salesman',
+            company_id=cls.branch_company.id,
+            company_ids=[(6, 0, cls.branch_company.ids)],
+        )
+        cls.branch_env = cls.env(
+            user=cls.branch_user,
+            context=dict(cls.env.context, allowed_company_ids=cls.branch_company.ids),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls._report()
+        super().tearDownClass()
+
+    # ── Generación de datos ──
+
+    @classmethod
+    def _create_company_tree(cls):
+        Company = cls.env['res.company']
+        companies = Company.create({'name': 'Bench Root 0'})
+        while len(companies) < BENCH_COMPANIES:
+            parent = companies[(len(companies) - 1) // BENCH_BRANCHING]
+            companies |= Company.create({
+                'name': f'Bench Company {len(companies)}',
+                'parent_id': parent.id,
+            })
+        cls.companies = companies
+
+    @classmethod
+    def _create_programs(cls):
+        vals_list = []
+        for index in range(BENCH_PROGRAMS):
+            owner = cls.rng.choice(cls.companies) if cls.rng.random() > 0.1 else cls.env['res.company']
+            excluded = owner._get_descendant_company_ids()
+            candidates = [company for company in cls.companies if company.id not in excluded]
+            allowed = cls.env['res.company'].browse([
+                company.id for company in cls.rng.sample(candidates, min(len(candidates), cls.rng.randint(0, 3)))
+            ])
+            allowed_ids = allowed._get_descendant_company_ids() - excluded
+            vals_list.append({
+                'name': f'Bench Program {index}',
+                'program_type': 'loyalty',
+                'company_id': owner.id,
+                'multi_company_ids': [(6, 0, list(allowed_ids))],
+            })
+        cls.programs = cls.env['loyalty.program'].create(vals_list)
+
+    @classmethod
+    def _create_cards(cls):
+        cards = cls.env['loyalty.card'].create([
+            {'program_id': cls.rng.choice(cls.programs).id, 'points': cls.rng.randint(0, 1000)}
+            for __ in range(BENCH_CARDS)
+        ])
+        cls.env['loyalty.history'].create([
+            {'card_id': card.id, 'description': 'Bench', 'issued': 10.0, 'used': 0.0}
+            for card in cards
+            for __ in range(BENCH_HISTORY_PER_CARD)
+        ])
+        cls.env.flush_all()
+
+    # ── Medición ──
+
+    def _measure(self, label, func):
+        """Ejecuta func BENCH_REPEAT veces con cachés del ORM vacías y registra latencia y consultas."""
+        cr = self.env.cr
+        timings = []
+        queries = 0
+        result = None
+        for __ in range(BENCH_REPEAT):
+            self.env.invalidate_all()
+            query_start = cr.sql_log_count
+            start = time.perf_counter()
+            result = func()
+            timings.append(time.perf_counter() - start)
+            queries += cr.sql_log_count - query_start
+        timings.sort()
+        self.results.append({
+            'label': label,
+            'median_ms': round(timings[len(timings) // 2] * 1000, 3),
+            'max_ms': round(timings[-1] * 1000, 3),
+            'queries': queries // BENCH_REPEAT,
+        })
+        return result
+
+    @classmethod
+    def _report(cls):
+        report = {
+            'params': {
+                'companies': BENCH_COMPANIES,
+                'branching': BENCH_BRANCHING,
+                'programs': BENCH_PROGRAMS,
+                'cards': BENCH_CARDS,
+                'history_per_card': BENCH_HISTORY_PER_CARD,
+                'repeat': BENCH_REPEAT,
+                'seed': BENCH_SEED,
+            },
+            'results': cls.results,
+        }
+        for row in cls.results:
+            _logger.info(
+                "loyalty_benchmark %-40s median %9.3f ms  max %9.3f ms  %4d queries",
+                row['label'], row['median_ms'], row['max_ms'], row['queries'],
+            )
+        if BENCH_REPORT:
+            with open(BENCH_REPORT, 'w', encoding='utf-8') as report_file:
+                json.dump(report, report_file, indent=2)
+
+    # ── Escenarios ──
+
+    def test_program_visibility(self):
+        Program = self.branch_env['loyalty.program']
+        programs = self._measure('loyalty.program search', lambda: Program.search([]))
+        self._measure('loyalty.program search_count', lambda: Program.search_count([]))
+        self._measure(
+            'loyalty.program read_group program_type',
+            lambda: Program._read_group([], ['program_type'], ['__count']),
+        )
+
+        expected = self.programs.filtered(
+            lambda program: not program.company_id or self.branch_company in program.effective_company_ids
+        )
+        self.assertEqual(programs & self.programs, expected)
+
+    def test_card_visibility(self):
+        Card = self.branch_env['loyalty.card']
+        self._measure('loyalty.card search limit 80', lambda: Card.search([], limit=80))
+        self._measure('loyalty.card search_count', lambda: Card.search_count([]))
+        self._measure(
+            'loyalty.card read_group program_id',
+            lambda: Card._read_group([], ['program_id'], ['__count', 'points:sum']),
+        )
+
+    def test_history_visibility(self):
+        History = self.branch_env['loyalty.history']
+        self._measure('loyalty.history search limit 80', lambda: History.search([], limit=80))
+        self._measure('loyalty.history search_count', lambda: History.search_count([]))
+        self._measure(
+            'loyalty.history read_group card_id',
+            lambda: History._read_group([], ['card_id'], ['__count'], limit=80),
+        )
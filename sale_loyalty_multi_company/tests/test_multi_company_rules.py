@@ -0,0 +1,66 @@
+from odoo.tests import TransactionCase, new_test_user, tagged
+from odoo.tools import SQL
+
+RULE_MODELS = ('loyalty.program', 'loyalty.card', 'loyalty.history', 'loyalty.rule', 'loyalty.reward')
+
+
+@tagged('-at_install', 'post_install')
+class TestMultiCompanyLoyaltyRules(TransactionCase):
+    """Las reglas multi empresa de lealtad filtran por el conjunto materializado de empresas efectivas."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Company = cls.env['res.company']
+        cls.parent_company = Company.create({'name': 'Matriz'})
+        cls.branch_company = Company.create({'name': 'Sucursal', 'parent_id': cls.parent_company.id})
+        program = cls.env['loyalty.program'].create({
+            'name': 'Programa de la matriz',
+            'company_id': cls.parent_company.id,
+        })
+        card = cls.env['loyalty.card'].create({'program_id': program.id, 'points': 10})
+        cls.env['loyalty.history'].create({'card_id': card.id, 'issued': 10, 'used': 0})
+        cls.branch_user = new_test_user(
+            cls.env,
+            login='loyalty_rules_branch_user',
+            groups='base.group_user,sales_team.group_sale_salesman',
+            company_id=cls.branch_company.id,
+            company_ids=[(6, 0, cls.branch_company.ids)],
+        )
+        cls.branch_env = cls.env(
+            user=cls.branch_user,
+            context=dict(cls.env.context, allowed_company_ids=cls.branch_company.ids),
+        )
+
+    def _rule_plan(self, model):
+        """Plan de la consulta de búsqueda con las reglas multi empresa del usuario de sucursal.
+
+        Se desactivan los recorridos secuenciales para comprobar que el filtro por
+        empresas efectivas puede resolverse con índice con cualquier volumen de datos.
+        """
+        query = self.branch_env[model]._search([])
+        self.env.flush_all()
+        self.env.cr.execute("ANALYZE loyalty_program_effective_company_rel")
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        try:
+            self.env.cr.execute(SQL("EXPLAIN %s", query.select()))
+            plan = '\n'.join(row[0] for row in self.env.cr.fetchall())
+        finally:
+            self.env.cr.execute("RESET enable_seqscan")
+        return plan
+
+    def test_branch_user_sees_parent_program(self):
+        programs = self.branch_env['loyalty.program'].search([])
+        self.assertIn(self.parent_company, programs.company_id)
+
+    def test_rules_use_effective_company_index(self):
+        for model in RULE_MODELS:
+            with self.subTest(model=model):
+                plan = self._rule_plan(model)
+                rel_lines = [line for line in plan.splitlines() if 'loyalty_program_effective_company_rel' in line]
+                self.assertTrue(rel_lines, f"La regla de {model} no usa el conjunto materializado:\n{plan}")
+                self.assertTrue(
+                    all('Index' in line for line in rel_lines),
+                    f"La regla de {model} recorre la tabla de empresas efectivas sin índice:\n{plan}",
+                )
+                self.assertNotIn('parent_path', plan, f"La regla de {model} aún expande la jerarquía:\n{plan}")
@@ -0,0 +1 @@
+from . import loyalty_program_company_wizard
@@ -0,0 +1,102 @@
+import time
+from collections import defaultdict
+
+from odoo import _, api, fields, models
+from odoo.exceptions import ValidationError
+from odoo.fields import Command
+
+
+class LoyaltyProgramCompanyWizard(models.TransientModel):
+    _name = 'loyalty.program.company.wizard'
+    _description = 'Asignación masiva de empresas permitidas'
+
+    program_ids = fields.Many2many(
+        comodel_name='loyalty.program',
+        string="Programas",
+        required=True,
+    )
+    company_ids = fields.Many2many(
+        comodel_name='res.company',
+        string="Empresas",
+        help="Se amplían automáticamente a sus sucursales. La empresa principal de cada programa y sus sucursales se excluyen.",
+    )
+    mode = fields.Selection(
+        selection=[
+            ('add', 'Agregar'),
+            ('replace', 'Reemplazar'),
+            ('remove', 'Quitar'),
+        ],
+        string="Operación",
+        required=True,
+        default='add',
+    )
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super().default_get(fields_list)
+        if 'program_ids' in fields_list and self.env.context.get('active_model') == 'loyalty.program':
+            res['program_ids'] = [Command.set(self.env.context.get('active_ids', []))]
+        return res
+
+    def _check_removable_companies(self, programs, remaining):
+        blocked = self.company_ids.filtered(
+            lambda company: (company._get_ancestor_company_ids() - {company.id}) & set(remaining.ids)
+        )
+        if blocked:
+            raise ValidationError(_(
+                "No se puede quitar %(branches)s de %(programs)s mientras su empresa padre siga asignada. "
+                "Quite también la empresa padre.",
+                branches=", ".join(blocked.mapped('name')),
+                programs=", ".join(programs.mapped('name')),
+            ))
+
+    def action_assign_companies(self):
+        """Aplica el conjunto de empresas con una escritura por cada resultado distinto y notifica el resultado."""
+        self.ensure_one()
+        if not self.company_ids and self.mode != 'replace':
+            raise ValidationError(_("Debe seleccionar al menos una empresa."))
+
+        start = time.perf_counter()
+        selected_ids = self.company_ids._get_descendant_company_ids()
+
+        # Agrupa por (empresa principal, empresas actuales): todos los programas del grupo
+        # terminan con el mismo conjunto y se escriben juntos.
+        groups = defaultdict(lambda: self.env['loyalty.program'])
+        for program in self.program_ids:
+            groups[program.company_id, frozenset(program.multi_company_ids.ids)] |= program
+
+        updates = defaultdict(lambda: self.env['loyalty.program'])
+        for (owner, current_ids), programs in groups.items():
+            if self.mode == 'add':
+                new_ids = current_ids | selected_ids
+            elif self.mode == 'remove':
+                # Una sucursal no puede quitarse mientras su empresa padre siga asignada:
+                # las reglas de acceso y el formulario la volverían a incluir
+                remaining = self.env['res.company'].browse(list(current_ids - selected_ids))
+                self._check_removable_companies(programs, remaining)
+                # Las empresas que quedan se vuelven a ampliar a sus sucursales
+                new_ids = remaining._get_descendant_company_ids()
+            else:
+                new_ids = frozenset(selected_ids)
+            new_ids = frozenset(new_ids - owner._get_descendant_company_ids())
+            if new_ids != current_ids:
+                updates[new_ids] |= programs
+
+        for new_ids, programs in updates.items():
+            programs.write({'multi_company_ids': [Command.set(list(new_ids))]})
+        self.env.flush_all()
+
+        elapsed = time.perf_counter() - start
+        affected = sum(len(programs) for programs in updates.values())
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Empresas asignadas"),
+                'message': _("%(affected)s de %(total)s programas actualizados en %(elapsed).2f s (%(writes)s escrituras).",
+                             affected=affected, total=len(self.program_ids),
+                             elapsed=elapsed, writes=len(updates)),
+                'type': 'success',
+                'next': {'type': 'ir.actions.act_window_close'},
+            },
+        }